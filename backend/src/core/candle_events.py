@@ -0,0 +1,58 @@
+# src/core/candle_events.py
+import asyncio
+import threading
+from dataclasses import dataclass
+from src.utils.logger import get_logger
+
+logger = get_logger("core.candle_events")
+
+
+@dataclass(frozen=True)
+class CandleClosed:
+    """A new closed candle is stored for symbol/timeframe; time = its open time (epoch seconds)."""
+    symbol: str
+    timeframe: str
+    time: int
+
+
+class CandleEventBus:
+    """
+    In-process pub/sub for candle-closed events. Use as a singleton via get_instance().
+    Subscribers get an asyncio.Queue bound to their event loop; publish() is
+    thread-safe, so pipeline worker threads can publish directly.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._subscribers: list[tuple[str, str, asyncio.Queue, asyncio.AbstractEventLoop]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CandleEventBus()
+        return cls._instance
+
+    def subscribe(self, symbol: str, timeframe: str) -> asyncio.Queue:
+        """Queue receiving CandleClosed events for symbol/timeframe. Call from inside the event loop."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.append((symbol, timeframe, queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[2] is not queue]
+
+    def publish(self, event: CandleClosed):
+        with self._lock:
+            targets = [(q, loop) for symbol, tf, q, loop in self._subscribers
+                       if symbol == event.symbol and tf == event.timeframe]
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                self.unsubscribe(queue)
+        logger.debug(f"🕯️ {event.symbol}-{event.timeframe} closed at {event.time} → {len(targets)} subscriber(s)")
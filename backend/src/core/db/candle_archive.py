@@ -0,0 +1,138 @@
+# src/core/db/candle_archive.py
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from src.core.db.candles import Candles, CANDLE_DTYPES
+from src.core.db.ohlc_repository import fetch_ohlc_arrays, get_ohlc_table
+from src.utils.logger import get_logger
+
+logger = get_logger("db.candle_archive")
+
+# Relative paths resolve against backend/, not the process working directory
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+ARCHIVE_DIR = BACKEND_DIR / os.getenv("CANDLE_ARCHIVE_DIR", "data/candles")
+
+
+class CandleArchive:
+    """
+    Columnar candle archive on local disk.
+
+    Layout: <root>/<symbol>/<timeframe>/<column>.bin — one raw array
+    per column, so a whole history can be memory-mapped without copying.
+    Rows are kept in strictly increasing time. New rows are appended; rows the DB
+    changed (upserts of existing bars, verify repairs) are rewritten in place.
+    Files are never truncated, so memory-mapped readers are never cut short
+    (and Windows, which refuses to truncate a mapped file, works). The row count
+    is the shortest column; time is written last, so leftovers of an interrupted
+    write are ignored and overwritten by the next one.
+    """
+
+    _instance = None
+
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CandleArchive()
+        return cls._instance
+
+    # ===================================================
+    # Read
+    # ===================================================
+    def load(self, symbol: str, timeframe: str) -> Candles:
+        """Memory-map the archived candles (read-only, zero-copy). Empty if nothing archived."""
+        folder = self._folder(symbol, timeframe)
+        rows = self._row_count(folder)
+        if rows == 0:
+            return Candles.empty()
+
+        return Candles(**{
+            name: np.memmap(folder / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+            for name, dtype in CANDLE_DTYPES.items()
+        })
+
+    def last_time(self, symbol: str, timeframe: str):
+        folder = self._folder(symbol, timeframe)
+        rows = self._row_count(folder)
+        return self._read_time(folder, rows - 1) if rows else None
+
+    # ===================================================
+    # Write
+    # ===================================================
+    def write(self, symbol: str, timeframe: str, candles: Candles) -> int:
+        """
+        Store candles (ascending). Archived rows from candles' first time on are replaced,
+        so `candles` must hold every bar from that time (a DB read does). Returns rows written.
+        """
+        if candles is None or candles.is_empty:
+            return 0
+
+        with self._lock:
+            folder = self._folder(symbol, timeframe)
+            folder.mkdir(parents=True, exist_ok=True)
+            rows = self._row_count(folder)
+            start = self._find_row(folder, rows, int(candles.time[0])) if rows else 0
+
+            # time is written last so a partially written batch never looks complete
+            for name, dtype in CANDLE_DTYPES.items():
+                if name == "time":
+                    continue
+                self._write_column(folder / f"{name}.bin", start, getattr(candles, name), dtype)
+            self._write_column(folder / "time.bin", start, candles.time, CANDLE_DTYPES["time"])
+            return len(candles)
+
+    def sync_from_db(self, symbol: str, timeframe: str, since: int = None) -> int:
+        """
+        Bring the archive up to the DB: pulls only rows with time > last archived time.
+        since: bars from this time on may have changed in the DB (an upsert of an existing
+        bar, a verify repair); they are re-read and rewritten too.
+        The first call copies the whole table once.
+        """
+        last_time = self.last_time(symbol, timeframe)
+        after_time = last_time
+        if since is not None and last_time is not None and since <= last_time:
+            after_time = int(since) - 1
+        new_rows = fetch_ohlc_arrays(get_ohlc_table(symbol, timeframe), after_time=after_time)
+        written = self.write(symbol, timeframe, new_rows)
+        if written:
+            logger.info(f"🗄️ Archived {written} candles for {symbol}-{timeframe}")
+        return written
+
+    # ===================================================
+    # Internal
+    # ===================================================
+    def _folder(self, symbol, timeframe) -> Path:
+        return self.root / symbol / timeframe
+
+    @staticmethod
+    def _row_count(folder: Path) -> int:
+        counts = []
+        for name, dtype in CANDLE_DTYPES.items():
+            path = folder / f"{name}.bin"
+            if not path.exists():
+                return 0
+            counts.append(path.stat().st_size // np.dtype(dtype).itemsize)
+        return min(counts)
+
+    @staticmethod
+    def _read_time(folder: Path, row: int) -> int:
+        itemsize = np.dtype(CANDLE_DTYPES["time"]).itemsize
+        with open(folder / "time.bin", "rb") as f:
+            f.seek(row * itemsize)
+            return int(np.frombuffer(f.read(itemsize), dtype=CANDLE_DTYPES["time"])[0])
+
+    @staticmethod
+    def _find_row(folder: Path, rows: int, time: int) -> int:
+        """Index of the first archived row with time >= `time` (rows when all are older)."""
+        times = np.memmap(folder / "time.bin", dtype=CANDLE_DTYPES["time"], mode="r", shape=(rows,))
+        return int(np.searchsorted(times, time, side="left"))
+
+    @staticmethod
+    def _write_column(path: Path, row: int, values: np.ndarray, dtype):
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(row * np.dtype(dtype).itemsize)
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
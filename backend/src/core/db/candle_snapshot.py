@@ -0,0 +1,87 @@
+# src/core/db/candle_snapshot.py
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from src.core.db.candles import Candles
+from src.core.db.candle_store import CandleStore
+
+
+@dataclass(frozen=True)
+class CandleSnapshot:
+    """
+    Immutable view of one symbol/timeframe's candles, taken once per pipeline tick
+    and handed to every sub-service so they all see the same bars.
+
+    The DataFrame is built once with the columns the strategy services expect:
+    `time` / `timestamp` as naive-UTC datetime64, open/high/low/close as float64,
+    plus `epoch` (int64 seconds). Column arrays are read-only; frame() hands out
+    shallow copies so callers may add or replace columns without touching the snapshot.
+    after() / until() answer "next n bars after t" / "last n bars up to t" with a
+    binary search on the sorted epoch column (O(log n + n)) instead of full-frame masks.
+    """
+
+    symbol: str
+    timeframe: str
+    candles: Candles
+    _frame: pd.DataFrame
+
+    @classmethod
+    def take(cls, symbol: str, timeframe: str) -> "CandleSnapshot":
+        """Snapshot the shared CandleStore (one top-up read of new candles)."""
+        return cls.from_candles(symbol, timeframe, CandleStore.get_instance().get_candles(symbol, timeframe))
+
+    @classmethod
+    def from_candles(cls, symbol: str, timeframe: str, candles: Candles) -> "CandleSnapshot":
+        times = pd.to_datetime(candles.time, unit="s").values
+        times.flags.writeable = False
+        frame = pd.DataFrame({
+            "time": times,
+            "open": candles.open,
+            "high": candles.high,
+            "low": candles.low,
+            "close": candles.close,
+            "tick_volume": candles.tick_volume,
+            "spread": candles.spread,
+            "real_volume": candles.real_volume,
+            "timestamp": times,
+            "epoch": candles.time,
+        }, copy=False)
+        return cls(symbol, timeframe, candles, frame)
+
+    def __len__(self):
+        return len(self.candles)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.candles.is_empty
+
+    def frame(self) -> pd.DataFrame:
+        """All candles as a DataFrame (shallow copy over the shared read-only arrays)."""
+        return self._frame.copy(deep=False)
+
+    def tail(self, n: int) -> pd.DataFrame:
+        """Newest n candles, index reset to 0..n-1."""
+        return self._rows(max(0, len(self) - n), len(self))
+
+    # ===================================================
+    # Time index
+    # ===================================================
+    def after(self, t, n: int) -> pd.DataFrame:
+        """Up to n candles with time > t, oldest first (index 0..)."""
+        start = int(np.searchsorted(self.candles.time, self._seconds(t), side="right"))
+        return self._rows(start, start + n)
+
+    def until(self, t, n: int) -> pd.DataFrame:
+        """Up to n newest candles with time <= t, oldest first (index 0..)."""
+        end = int(np.searchsorted(self.candles.time, self._seconds(t), side="right"))
+        return self._rows(max(0, end - n), end)
+
+    def _rows(self, start, end) -> pd.DataFrame:
+        return self._frame.iloc[start:end].reset_index(drop=True)
+
+    @staticmethod
+    def _seconds(t) -> float:
+        """Epoch seconds for int/float epochs, datetimes (naive = UTC), Timestamps or strings."""
+        if isinstance(t, (int, float, np.integer, np.floating)):
+            return float(t)
+        return pd.Timestamp(t).value / 1e9
@@ -0,0 +1,148 @@
+# src/core/db/candle_store.py
+import threading
+import numpy as np
+import pandas as pd
+from src.core.db.candles import Candles
+from src.core.db.candle_archive import CandleArchive
+from src.core.db.ohlc_repository import fetch_ohlc_arrays, get_ohlc_table
+from src.utils.logger import get_logger
+
+logger = get_logger("db.candle_store")
+
+
+class CandleStore:
+    """
+    Process-wide OHLC cache keyed by (symbol, timeframe). Use as a singleton via get_instance().
+    Data is held as read-only columnar Candles; DataFrames are built on demand.
+
+    The cached Candles are the local CandleArchive memory-mapped as is: each read
+    first syncs the archive with the DB (only rows with time > last archived time),
+    and new bars are written to the archive and re-mapped instead of concatenated
+    in RAM, so the history is never copied. A new Candles object is cached only
+    when the data changed. If the archive can't be written, candles are read from
+    MySQL and kept in memory instead.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._candles: dict[tuple[str, str], Candles] = {}
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CandleStore()
+        return cls._instance
+
+    # ===================================================
+    # Public API
+    # ===================================================
+    def get(self, symbol: str, timeframe: str, refresh: bool = True) -> pd.DataFrame:
+        """
+        Return the cached candles for symbol/timeframe as a DataFrame, topping up new rows first.
+        The frame wraps read-only arrays: adding or replacing columns is fine,
+        writing into existing values raises.
+        """
+        candles = self.get_candles(symbol, timeframe, refresh=refresh)
+        return candles.to_frame() if not candles.is_empty else pd.DataFrame()
+
+    def get_candles(self, symbol: str, timeframe: str, refresh: bool = True) -> Candles:
+        """Same as get(), but returns the columnar Candles container (no DataFrame)."""
+        key = (symbol, timeframe)
+        with self._lock_for(key):
+            candles = self._candles.get(key)
+            if candles is None:
+                candles = self._load(symbol, timeframe)
+            elif refresh:
+                candles = self._refresh(symbol, timeframe, candles)
+        return candles
+
+    def last_time(self, symbol: str, timeframe: str):
+        """Time of the newest cached candle, or None if nothing is cached yet."""
+        candles = self._candles.get((symbol, timeframe))
+        return candles.last_time() if candles is not None else None
+
+    def reload_from(self, symbol: str, timeframe: str, since: int) -> bool:
+        """
+        Re-read cached candles with time >= since from the DB (bars changed by an upsert
+        or a verify repair), rewriting them in the archive too.
+        Returns True if the archive was rewritten; False if symbol/timeframe is not
+        cached from the archive (nothing cached, or the in-memory fallback).
+        """
+        key = (symbol, timeframe)
+        with self._lock_for(key):
+            candles = self._candles.get(key)
+            if candles is None or candles.is_empty or since > candles.last_time():
+                return False
+            archived = self._from_archive(symbol, timeframe, since=since)
+            if archived is not None and not archived.is_empty:
+                self._candles[key] = archived
+                return True
+
+            keep = candles[:int(np.searchsorted(candles.time, since, side="left"))]
+            fresh = fetch_ohlc_arrays(get_ohlc_table(symbol, timeframe), after_time=int(since) - 1)
+            if fresh.is_empty:
+                # Failed read: drop the cache rather than serve stale bars
+                self._candles.pop(key, None)
+                return False
+            self._candles[key] = keep.concat(fresh).freeze()
+            return False
+
+    def invalidate(self, symbol: str = None, timeframe: str = None):
+        """Drop cached candles (all, per symbol, or one symbol/timeframe)."""
+        with self._registry_lock:
+            for key in list(self._candles):
+                if symbol not in (None, key[0]) or timeframe not in (None, key[1]):
+                    continue
+                self._candles.pop(key, None)
+
+    # ===================================================
+    # Internal
+    # ===================================================
+    def _lock_for(self, key):
+        with self._registry_lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _from_archive(self, symbol, timeframe, since=None):
+        """Sync the archive with the DB and memory-map it. None if the archive can't be used."""
+        archive = CandleArchive.get_instance()
+        try:
+            archive.sync_from_db(symbol, timeframe, since=since)
+            return archive.load(symbol, timeframe).freeze()
+        except OSError as e:
+            logger.warning(f"⚠️ Candle archive unavailable for {symbol}-{timeframe} ({e}), keeping candles in memory")
+            return None
+
+    def _load(self, symbol, timeframe):
+        candles = self._from_archive(symbol, timeframe)
+        if candles is None:
+            candles = fetch_ohlc_arrays(get_ohlc_table(symbol, timeframe)).freeze()
+        # Don't cache a failed/empty load, so the next read retries
+        if not candles.is_empty:
+            self._candles[(symbol, timeframe)] = candles
+            logger.info(f"📦 Cached {len(candles)} candles for {symbol}-{timeframe}")
+        return candles
+
+    def _refresh(self, symbol, timeframe, candles):
+        if candles.is_empty:
+            return self._load(symbol, timeframe)
+
+        archived = self._from_archive(symbol, timeframe)
+        if archived is not None and not archived.is_empty:
+            if len(archived) == len(candles) and archived.last_time() == candles.last_time():
+                return candles
+            self._candles[(symbol, timeframe)] = archived
+            return archived
+
+        # In-memory fallback: append the DB tail
+        new_rows = fetch_ohlc_arrays(get_ohlc_table(symbol, timeframe), after_time=candles.last_time())
+        if new_rows.is_empty:
+            return candles
+
+        candles = candles.concat(new_rows).freeze()
+        self._candles[(symbol, timeframe)] = candles
+        return candles
@@ -0,0 +1,112 @@
+# src/core/db/candles.py
+from dataclasses import dataclass, fields
+import numpy as np
+import pandas as pd
+
+CANDLE_DTYPES = {
+    "time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "tick_volume": np.int32,
+    "spread": np.int32,
+    "real_volume": np.int32,
+}
+
+
+@dataclass(frozen=True)
+class Candles:
+    """
+    Columnar OHLCV container: contiguous float64 prices, int64 epoch times
+    and int32 volume/spread. Slicing returns views, never copies.
+    """
+
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    tick_volume: np.ndarray
+    spread: np.ndarray
+    real_volume: np.ndarray
+
+    # ===================================================
+    # Constructors
+    # ===================================================
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(**{name: np.empty(0, dtype=dtype) for name, dtype in CANDLE_DTYPES.items()})
+
+    @classmethod
+    def from_rows(cls, rows, columns=None) -> "Candles":
+        """
+        Build straight from cursor.fetchall() tuples.
+        DECIMAL prices are converted once here, so nothing downstream sees Decimal.
+        """
+        if not rows:
+            return cls.empty()
+        columns = columns or list(CANDLE_DTYPES)
+        by_name = dict(zip(columns, zip(*rows)))
+        n = len(rows)
+        return cls(**{
+            name: (
+                np.array(by_name[name], dtype=dtype)
+                if name in by_name else np.zeros(n, dtype=dtype)
+            )
+            for name, dtype in CANDLE_DTYPES.items()
+        })
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Candles":
+        if df is None or df.empty:
+            return cls.empty()
+        n = len(df)
+        return cls(**{
+            name: (
+                df[name].to_numpy(dtype=dtype)
+                if name in df.columns else np.zeros(n, dtype=dtype)
+            )
+            for name, dtype in CANDLE_DTYPES.items()
+        })
+
+    # ===================================================
+    # Views / conversion
+    # ===================================================
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, item) -> "Candles":
+        if not isinstance(item, slice):
+            raise TypeError("Candles only supports slice indexing")
+        return Candles(**{f.name: getattr(self, f.name)[item] for f in fields(self)})
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.time) == 0
+
+    def tail(self, n: int) -> "Candles":
+        return self[max(0, len(self) - n):]
+
+    def last_time(self):
+        return int(self.time[-1]) if len(self) else None
+
+    def concat(self, other: "Candles") -> "Candles":
+        if other.is_empty:
+            return self
+        if self.is_empty:
+            return other
+        return Candles(**{
+            f.name: np.concatenate([getattr(self, f.name), getattr(other, f.name)])
+            for f in fields(self)
+        })
+
+    def freeze(self) -> "Candles":
+        """Mark all column arrays read-only (in place) and return self."""
+        for f in fields(self):
+            getattr(self, f.name).flags.writeable = False
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """Legacy DataFrame view over the same arrays (no copy)."""
+        return pd.DataFrame({f.name: getattr(self, f.name) for f in fields(self)}, copy=False)
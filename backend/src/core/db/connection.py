@@ -14,6 +14,8 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD", ""),
     "database": os.getenv("DB_NAME", "trade_record_position"),
     "autocommit": os.getenv("DB_AUTOCOMMIT", "False").lower() == "true",
+    # Enables LOAD DATA LOCAL INFILE for bulk OHLC backfills
+    "allow_local_infile": os.getenv("DB_ALLOW_LOCAL_INFILE", "False").lower() == "true",
 }
 
 @contextmanager
@@ -0,0 +1,123 @@
+# src/core/db/ohlc_repository.py
+import re
+import calendar
+from datetime import datetime
+import pandas as pd
+from src.core.db.connection import get_connection
+from src.core.db.candles import Candles
+from src.utils.logger import get_logger
+
+logger = get_logger("db.ohlc_repository")
+
+OHLC_COLUMNS = ["time", "open", "high", "low", "close", "tick_volume", "spread", "real_volume"]
+TIMEFRAME_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400}
+TIMEFRAMES = tuple(TIMEFRAME_SECONDS)
+
+
+def get_ohlc_table(symbol: str, timeframe: str) -> str:
+    """Resolve the OHLC table name for a symbol/timeframe (e.g. XAUUSDc/M15 → ohlc_xauusdc_m15_data)."""
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    if not re.fullmatch(r"[A-Za-z0-9_]+", symbol):
+        raise ValueError(f"Invalid symbol: {symbol}")
+    return f"ohlc_{symbol.lower()}_{timeframe.lower()}_data"
+
+
+def fetch_ohlc_arrays(table_name: str, after_time: int = None) -> Candles:
+    """
+    Fetch OHLCV data from the given table as a columnar Candles container.
+    If after_time is given, only candles with time > after_time are returned.
+    """
+    query = f"""
+        SELECT {", ".join(OHLC_COLUMNS)}
+        FROM {table_name}
+        {"WHERE time > %s" if after_time is not None else ""}
+        ORDER BY time ASC
+    """
+    params = (int(after_time),) if after_time is not None else ()
+    try:
+        candles = _query_candles(query, params)
+        if candles.is_empty and after_time is None:
+            logger.warning(f"No data found in {table_name}.")
+        return candles
+
+    except Exception as e:
+        logger.error(f"Error fetching data from {table_name}: {e}")
+        return Candles.empty()
+
+
+def fetch_ohlc_data(table_name: str, after_time: int = None):
+    """Generic function to fetch OHLCV data from the given table (DataFrame form)."""
+    candles = fetch_ohlc_arrays(table_name, after_time=after_time)
+    return candles.to_frame() if not candles.is_empty else pd.DataFrame()
+
+
+def fetch_candle_arrays(symbol: str, timeframe: str, limit: int = None, start=None, end=None) -> Candles:
+    """
+    Bounded OHLCV read for symbol/timeframe.
+    - limit=N      → newest N candles (ORDER BY time DESC LIMIT N, then reversed)
+    - start / end  → candles with start <= time < end (epoch seconds or UTC datetime)
+    Both can be combined, e.g. limit=100, end=t → last 100 candles before t.
+    Result is in ascending time order, like fetch_ohlc_data.
+    """
+    if limit is None and start is None and end is None:
+        raise ValueError("fetch_candles needs limit and/or a start/end window")
+
+    table_name = get_ohlc_table(symbol, timeframe)
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("time >= %s")
+        params.append(_to_epoch(start))
+    if end is not None:
+        conditions.append("time < %s")
+        params.append(_to_epoch(end))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    if limit is not None:
+        query = f"""
+            SELECT {", ".join(OHLC_COLUMNS)}
+            FROM {table_name}
+            {where}
+            ORDER BY time DESC
+            LIMIT %s
+        """
+        params.append(int(limit))
+    else:
+        query = f"""
+            SELECT {", ".join(OHLC_COLUMNS)}
+            FROM {table_name}
+            {where}
+            ORDER BY time ASC
+        """
+
+    try:
+        return _query_candles(query, tuple(params), reverse=limit is not None)
+    except Exception as e:
+        logger.error(f"Error fetching bounded candles from {table_name}: {e}")
+        return Candles.empty()
+
+
+def fetch_candles(symbol: str, timeframe: str, limit: int = None, start=None, end=None):
+    """DataFrame form of fetch_candle_arrays for legacy callers."""
+    candles = fetch_candle_arrays(symbol, timeframe, limit=limit, start=start, end=end)
+    return candles.to_frame() if not candles.is_empty else pd.DataFrame()
+
+
+def _query_candles(query, params, reverse=False) -> Candles:
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        cursor.close()
+
+    if reverse:
+        rows.reverse()
+    return Candles.from_rows(rows, columns)
+
+
+def _to_epoch(value) -> int:
+    """Epoch seconds from int/float or datetime (naive datetimes are treated as UTC)."""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
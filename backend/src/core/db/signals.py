@@ -39,8 +39,11 @@ def get_signals():
         return []
 
 
-def insert_signal(signal):
-    """Insert a new trading signal into the database."""
+def insert_signal(signal, conn=None):
+    """
+    Insert a new trading signal into the database.
+    With `conn`, the insert joins the caller's transaction (no commit) and DB errors propagate.
+    """
     required_keys = ['instrument', 'action', 'range1', 'range2', 'tp1', 'tp2', 'sl', 'comment']
     for key in required_keys:
         if key not in signal:
@@ -65,26 +68,33 @@ def insert_signal(signal):
             reward = abs(min(r1, r2) - tp1_val)
 
         # DB insert
-        with get_connection() as conn:
+        query = """
+            INSERT INTO trading_signals 
+            (instrument, action, range1, range2, tp1, tp2, sl, comment, message, risk, reward)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        values = (
+            signal['instrument'], action, r1, r2,
+            tp1_val, tp2_val, sl,
+            signal['comment'], signal.get('message'),
+            risk, reward
+        )
+        if conn is not None:
             with conn.cursor() as cursor:
-                query = """
-                    INSERT INTO trading_signals 
-                    (instrument, action, range1, range2, tp1, tp2, sl, comment, message, risk, reward)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(query, (
-                    signal['instrument'], action, r1, r2,
-                    tp1_val, tp2_val, sl,
-                    signal['comment'], signal.get('message'),
-                    risk, reward
-                ))
-                conn.commit()
+                cursor.execute(query, values)
+        else:
+            with get_connection() as own_conn:
+                with own_conn.cursor() as cursor:
+                    cursor.execute(query, values)
+                    own_conn.commit()
         logger.info(f"✅ Signal inserted: {signal['instrument']} ({action})")
 
     except (ValueError, KeyError) as e:
         logger.error(f"Invalid signal data: {e}")
     except Error as e:
         logger.error(f"Database error: {e}")
+        if conn is not None:
+            raise
 
 # =========================
 # 🔹 Update signal status
@@ -0,0 +1,229 @@
+# src/core/mt5/candle_aggregator.py
+import MetaTrader5 as mt5
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from src.core.db.connection import get_connection
+from src.core.db.candles import Candles, CANDLE_DTYPES
+from src.core.db.ohlc_repository import OHLC_COLUMNS as CANDLE_COLUMNS
+from src.core.mt5.data_fetcher import upsert_ohlc_rows, sync_candle_caches
+from src.utils.logger import get_logger
+
+logger = get_logger("core.mt5.candle_aggregator")
+
+
+@dataclass(frozen=True)
+class DerivedTimeframe:
+    """A higher timeframe built from base bars (label, its table and the matching MT5 constant)."""
+    label: str
+    table_name: str
+    mt5_timeframe: int
+    seconds: int
+
+
+def aggregate_candles(candles: Candles, seconds: int, base_seconds: int, offset: int = 0) -> Candles:
+    """
+    Roll ascending base candles up into `seconds` buckets.
+
+    Bucket start = floor((time - offset) / seconds) * seconds + offset.
+    Only complete buckets are returned: the bucket's last base slot
+    (bucket_end - base_seconds) must be at or before the newest base candle.
+    open/close = first/last base bar, high/low = max/min, volumes summed,
+    spread = minimum (same as MT5 bars).
+    """
+    if candles.is_empty:
+        return Candles.empty()
+
+    buckets = (candles.time - offset) // seconds * seconds + offset
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    bucket_times = buckets[starts]
+    complete = bucket_times + seconds - base_seconds <= candles.time[-1]
+
+    columns = {
+        "time": bucket_times,
+        "open": candles.open[starts],
+        "high": np.maximum.reduceat(candles.high, starts),
+        "low": np.minimum.reduceat(candles.low, starts),
+        "close": candles.close[ends],
+        "tick_volume": np.add.reduceat(candles.tick_volume, starts),
+        "spread": np.minimum.reduceat(candles.spread, starts),
+        "real_volume": np.add.reduceat(candles.real_volume, starts),
+    }
+    return Candles(**{
+        name: np.ascontiguousarray(values[complete], dtype=CANDLE_DTYPES[name])
+        for name, values in columns.items()
+    })
+
+
+class CandleAggregator:
+    """
+    Builds higher-timeframe bars (M30/H1/H4/D1) from finalized base (M15) bars,
+    so only the base timeframe has to be pulled from MT5.
+
+    Times are the broker-server epochs MT5 returns, so D1/H4 buckets already
+    start at broker midnight; day_offset_seconds shifts the boundary for
+    brokers that roll the day elsewhere.
+    """
+
+    def __init__(self, symbol: str, base_table: str, base_seconds: int,
+                 targets: list[DerivedTimeframe], day_offset_seconds: int = 0):
+        self.symbol = symbol
+        self.base_table = base_table
+        self.base_seconds = base_seconds
+        self.targets = list(targets)
+        self.day_offset_seconds = day_offset_seconds
+        # {label: newest bar time} for targets that gained a new bar in the last update()
+        self.last_closed: dict[str, int] = {}
+        # {label: oldest bar time} upserted again by the last update() (rebuilt newest bar)
+        self.changed_since: dict[str, int] = {}
+        # {label: newest bar time} that verify() overwrote with MT5's values; update() keeps it
+        self.repaired_at: dict[str, int] = {}
+
+    # ===================================================
+    # Aggregation
+    # ===================================================
+    def update(self, conn) -> dict[str, int]:
+        """
+        Write newly completed bars for every target on `conn` (no commit),
+        so they land in the same transaction as the base candles.
+        The newest stored bar of each target is rebuilt too, in case it was
+        written while still forming, unless verify() already replaced it with
+        MT5's bar. Returns affected rows per label.
+        """
+        results = {}
+        self.last_closed = {}
+        self.changed_since = {}
+        cursor = conn.cursor()
+        try:
+            last_times = {t.label: self._last_time(cursor, t.table_name) for t in self.targets}
+            # One base read covers every target: start at the oldest bar we need to rebuild
+            starts = [last_times[t.label] for t in self.targets]
+            read_from = None if any(s is None for s in starts) else min(starts)
+            base = self._read_base(cursor, read_from)
+
+            for target in self.targets:
+                last_time = last_times[target.label]
+                since = 0 if last_time is None else int(np.searchsorted(base.time, last_time, side="left"))
+                bars = aggregate_candles(base[since:], target.seconds, self.base_seconds, self.day_offset_seconds)
+                if not bars.is_empty and int(bars.time[0]) == self.repaired_at.get(target.label):
+                    bars = bars[1:]
+                results[target.label] = upsert_ohlc_rows(cursor, target.table_name, self._to_rows(bars))
+                if last_time is not None and not bars.is_empty and bars.time[0] <= last_time:
+                    self.changed_since[target.label] = int(bars.time[0])
+                if not bars.is_empty and (last_time is None or bars.last_time() > last_time):
+                    self.last_closed[target.label] = bars.last_time()
+        finally:
+            cursor.close()
+
+        written = {label: rows for label, rows in results.items() if rows}
+        if written:
+            logger.info(f"🧮 {self.symbol} derived bars from {self.base_table}: {written}")
+        return results
+
+    def sync_archive(self):
+        """Mirror derived timeframes into the local candle archive (rebuilt bars are rewritten)."""
+        for target in self.targets:
+            try:
+                sync_candle_caches(self.symbol, target.label, since=self.changed_since.get(target.label))
+            except Exception as e:
+                logger.error(f"Archive sync failed for {self.symbol}-{target.label}: {e}")
+
+    # ===================================================
+    # Verification against MT5
+    # ===================================================
+    def verify(self, bars: int = 20, tolerance: float = 1e-5) -> dict[str, int]:
+        """
+        Compare the newest closed derived bars with MT5's own bars (low-frequency check).
+        Mismatching bars are overwritten with MT5's values and counted per label;
+        the local archive and CandleStore are refreshed from the first repaired bar.
+        Bars not derived yet are ignored.
+        """
+        mismatches = {}
+        repaired, newest_repaired = {}, {}
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for target in self.targets:
+                    # pos 0 is the bar still forming
+                    rates = mt5.copy_rates_from_pos(self.symbol, target.mt5_timeframe, 1, bars)
+                    if rates is None or len(rates) == 0:
+                        logger.warning(f"⚠️ No MT5 {target.label} bars to verify {self.symbol} against.")
+                        continue
+
+                    expected = pd.DataFrame(rates)
+                    expected["symbol"] = self.symbol
+                    for col in ["tick_volume", "spread", "real_volume"]:
+                        if col not in expected.columns:
+                            expected[col] = 0
+
+                    cursor.execute(
+                        f"""
+                        SELECT time, open, high, low, close FROM {target.table_name}
+                        WHERE symbol = %s AND time >= %s
+                        """,
+                        (self.symbol, int(expected["time"].min())),
+                    )
+                    stored = {int(row[0]): [float(v) for v in row[1:]] for row in cursor.fetchall()}
+                    if not stored:
+                        continue
+
+                    expected = expected[expected["time"] <= max(stored)]
+                    bad = [
+                        i for i, row in expected.iterrows()
+                        if int(row["time"]) not in stored
+                        or not np.allclose(stored[int(row["time"])], row[["open", "high", "low", "close"]].astype(float),
+                                           atol=tolerance)
+                    ]
+                    mismatches[target.label] = len(bad)
+                    if bad:
+                        logger.warning(
+                            f"⚠️ {self.symbol}-{target.label}: {len(bad)}/{len(expected)} derived bars differ from MT5 "
+                            f"(first at {pd.to_datetime(expected.loc[bad[0], 'time'], unit='s')}), repairing."
+                        )
+                        upsert_ohlc_rows(cursor, target.table_name, expected.loc[bad])
+                        repaired[target.label] = int(expected.loc[bad, "time"].min())
+                        newest_repaired[target.label] = int(expected.loc[bad, "time"].max())
+                conn.commit()
+                self.repaired_at.update(newest_repaired)
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"❌ {self.symbol} derived bar verification failed: {e}")
+                repaired = {}
+            finally:
+                cursor.close()
+
+        for label, since in repaired.items():
+            try:
+                sync_candle_caches(self.symbol, label, since=since)
+            except Exception as e:
+                logger.error(f"Archive sync failed for {self.symbol}-{label}: {e}")
+        return mismatches
+
+    # ===================================================
+    # Internal
+    # ===================================================
+    def _last_time(self, cursor, table_name):
+        cursor.execute(f"SELECT MAX(time) FROM {table_name} WHERE symbol = %s", (self.symbol,))
+        result = cursor.fetchone()
+        return int(result[0]) if result and result[0] is not None else None
+
+    def _read_base(self, cursor, since) -> Candles:
+        """Base candles with time >= since, read on the caller's connection (sees uncommitted rows)."""
+        cursor.execute(
+            f"""
+            SELECT {", ".join(CANDLE_COLUMNS)} FROM {self.base_table}
+            WHERE symbol = %s {"AND time >= %s" if since is not None else ""}
+            ORDER BY time ASC
+            """,
+            (self.symbol, int(since)) if since is not None else (self.symbol,),
+        )
+        rows = cursor.fetchall()
+        return Candles.from_rows(rows, [desc[0] for desc in cursor.description])
+
+    def _to_rows(self, bars: Candles) -> pd.DataFrame:
+        if bars.is_empty:
+            return pd.DataFrame()
+        df = bars.to_frame()
+        df["symbol"] = self.symbol
+        return df
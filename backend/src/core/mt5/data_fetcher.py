@@ -1,24 +1,86 @@
 import MetaTrader5 as mt5
 import pandas as pd
+import os
+import queue
+import tempfile
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional, Callable
-from src.core.db.connection import get_connection  # your unified DB connector
+from src.core.db.connection import get_connection, DB_CONFIG  # your unified DB connector
+from src.core.db.candle_archive import CandleArchive
+from src.core.db.candle_store import CandleStore
+from src.core.db.ohlc_repository import TIMEFRAME_SECONDS
 from src.utils.logger import get_logger
 from src.services.mt5_client import MT5Client
 
 logger = get_logger("core.mt5.data_fetcher")
 
+OHLC_COLUMNS = ["symbol", "time", "open", "high", "low", "close", "tick_volume", "spread", "real_volume"]
+
+
+def upsert_ohlc_rows(cursor, table_name: str, data: pd.DataFrame, rows_per_statement: int = 2000) -> int:
+    """
+    Multi-row INSERT ... ON DUPLICATE KEY UPDATE of OHLC rows into table_name.
+    Does not commit. Returns MySQL affected rows.
+    """
+    if data.empty:
+        return 0
+
+    columns = ", ".join(OHLC_COLUMNS)
+    placeholders = "(" + ", ".join(["%s"] * len(OHLC_COLUMNS)) + ")"
+    updates = ", ".join(f"{c} = VALUES({c})" for c in OHLC_COLUMNS if c not in ("symbol", "time"))
+    # object dtype turns numpy scalars into native Python values the connector accepts
+    rows = data[OHLC_COLUMNS].to_numpy(dtype=object).tolist()
+
+    affected_rows = 0
+    for i in range(0, len(rows), rows_per_statement):
+        batch = rows[i:i + rows_per_statement]
+        query = f"""
+            INSERT INTO {table_name} ({columns})
+            VALUES {", ".join([placeholders] * len(batch))}
+            ON DUPLICATE KEY UPDATE {updates}
+        """
+        cursor.execute(query, [value for row in batch for value in row])
+        affected_rows += cursor.rowcount
+    return affected_rows
+
+
+def sync_candle_caches(symbol: str, timeframe: str, since: int = None):
+    """
+    Mirror newly stored candles into the local archive. Bars from `since` on may have
+    been rewritten in the DB, so they are refreshed in the archive and the CandleStore too.
+    """
+    if since is not None and CandleStore.get_instance().reload_from(symbol, timeframe, since):
+        return  # the store rewrote the archive while reloading
+    CandleArchive.get_instance().sync_from_db(symbol, timeframe, since=since)
+
+
 # -----------------------------------------------
 # Generic Data Fetcher Class
 # -----------------------------------------------
 class MT5DataFetcher:
-    def __init__(self, symbol: str, table_name: str, timeframe: int, candle_seconds: int):
+    def __init__(self, symbol: str, table_name: str, timeframe: int, candle_seconds: int,
+                 chunk_candles: int = 5000, queue_size: int = 4, aggregator=None):
         self.symbol = symbol
         self.table_name = table_name
         self.timeframe = timeframe
         self.candle_seconds = candle_seconds
+        # Chunks are sized in candles, so every timeframe gets the same rows per MT5 round trip
+        self.chunk_seconds = chunk_candles * candle_seconds
+        self.queue_size = queue_size
+        # Metrics: MT5 calls that came back empty (closed market / no history)
+        self.empty_round_trips = 0
+        self.last_sync_empty_round_trips = 0
+        self.timeframe_label = next(
+            (label for label, seconds in TIMEFRAME_SECONDS.items() if seconds == candle_seconds), None
+        )
+        # Optional CandleAggregator: higher timeframes derived from this one, same transaction
+        self.aggregator = aggregator
+        # Oldest bar time re-upserted by the last sync (rewritten in the caches afterwards)
+        self.changed_since = None
         self.client = MT5Client.get_instance()
 
     def ensure_mt5_ready(self):
@@ -28,14 +90,22 @@ class MT5DataFetcher:
         return True
 
     def fetch_chunk(self, start_ts: int, end_ts: int) -> Optional[pd.DataFrame]:
-        """Fetch historical OHLC data for a specific range."""
+        """
+        Fetch historical OHLC data for a specific range.
+        Returns an empty frame when MT5 has no bars in the range, None on an MT5 error.
+        """
         try:
             utc_start = datetime.utcfromtimestamp(start_ts).replace(tzinfo=timezone.utc)
             utc_end = datetime.utcfromtimestamp(end_ts).replace(tzinfo=timezone.utc)
 
             rates = mt5.copy_rates_range(self.symbol, self.timeframe, utc_start, utc_end)
+            if rates is None:
+                code, message = mt5.last_error()
+                if code != mt5.RES_S_OK:
+                    logger.error(f"MT5 error fetching {self.symbol} chunk: {code} {message}")
+                    return None
             if rates is None or len(rates) == 0:
-                return None
+                return pd.DataFrame(columns=OHLC_COLUMNS)
 
             df = pd.DataFrame(rates)
             for col in ["tick_volume", "spread", "real_volume"]:
@@ -65,73 +135,245 @@ class MT5DataFetcher:
         return result[0] or 0
 
     def get_last_complete_timestamp(self) -> int:
-        """Last fully closed candle (add buffer)."""
+        """
+        Last fully closed candle (add buffer). The cut-off sits 2 minutes before the forming
+        bar's open, so the bar that just closed is included as soon as the next one starts.
+        """
         now = datetime.now(timezone.utc)
         floored = now - timedelta(
             seconds=(now.timestamp() % self.candle_seconds) + 120  # 2-minute buffer
         )
         return int(floored.timestamp())
 
-    def batch_insert(self, conn, data: pd.DataFrame) -> int:
-        """Efficient batch insert."""
+    def batch_insert(self, conn, data: pd.DataFrame, rows_per_statement: int = 2000) -> int:
+        """
+        Bulk upsert with multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+        Unlike REPLACE, overlapping rows are updated in place (no delete + insert).
+        Does not commit — the caller commits once per sync.
+        Returns MySQL affected rows (1 per new row, 2 per changed row, 0 if unchanged).
+        """
         if data.empty:
             return 0
 
-        query = f"""
-            REPLACE INTO {self.table_name} 
-            (symbol, time, open, high, low, close, tick_volume, spread, real_volume)
-            VALUES (%(symbol)s, %(time)s, %(open)s, %(high)s, %(low)s, %(close)s, %(tick_volume)s, %(spread)s, %(real_volume)s)
-        """
-
-        inserted_rows = 0
         cursor = conn.cursor()
         try:
-            for i in range(0, len(data), 500):
-                batch = data.iloc[i:i+500].to_dict("records")
-                cursor.executemany(query, batch)
-                conn.commit()
-                inserted_rows += cursor.rowcount
-            return inserted_rows
+            return upsert_ohlc_rows(cursor, self.table_name, data, rows_per_statement)
         except Exception as e:
             conn.rollback()
             logger.error(f"Database error: {e}")
-            return 0
+            raise
         finally:
             cursor.close()
 
-    def update_to_latest(self):
-        """Main sync routine — fetch missing candles and insert to DB."""
+    def load_data_insert(self, conn, data: pd.DataFrame) -> int:
+        """
+        Bulk load via LOAD DATA LOCAL INFILE for large backfills.
+        Rows already present are skipped (IGNORE) — candles are immutable once closed.
+        Needs DB_ALLOW_LOCAL_INFILE=True and local_infile enabled on the server.
+        Does not commit.
+        """
+        if data.empty:
+            return 0
+
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", newline="") as f:
+                data[OHLC_COLUMNS].to_csv(f, index=False, header=False, lineterminator="\n")
+
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    f"""
+                    LOAD DATA LOCAL INFILE %s
+                    IGNORE INTO TABLE {self.table_name}
+                    FIELDS TERMINATED BY ','
+                    LINES TERMINATED BY '\\n'
+                    ({", ".join(OHLC_COLUMNS)})
+                    """,
+                    (path,),
+                )
+                return cursor.rowcount
+            finally:
+                cursor.close()
+        finally:
+            os.remove(path)
+
+    def update_to_latest(self) -> dict[str, int]:
+        """
+        Main sync routine — fetch missing candles and insert to DB (plus derived timeframes).
+        Returns {timeframe: newest closed candle time} for every timeframe that got new bars.
+        """
         if not self.ensure_mt5_ready():
-            return
+            return {}
 
         conn_ctx = get_connection()
         conn = conn_ctx.__enter__()
         try:
             last_db_time = self.get_last_db_timestamp(conn)
             end_ts = self.get_last_complete_timestamp()
-
-            if last_db_time >= end_ts:
-                logger.info(f"{self.symbol} is already up-to-date.")
-                return
-
-            current = last_db_time or int(datetime(2011, 1, 1, tzinfo=timezone.utc).timestamp())
             total_inserted = 0
-            safety_counter = 0
+            self.last_sync_empty_round_trips = 0
+            self.changed_since = None
 
-            while current < end_ts and safety_counter < 1_000_000:
-                chunk_end = min(current + 3600, end_ts)
-                df = self.fetch_chunk(current, chunk_end)
-                if df is not None and not df.empty:
-                    inserted = self.batch_insert(conn, df)
-                    total_inserted += inserted
-                    current = df["time"].max() + self.candle_seconds
-                    # logger.info(
-                    #     f"[{self.symbol}] Inserted {inserted} rows → new start: {datetime.utcfromtimestamp(current)}"
-                    # )
+            try:
+                if last_db_time >= end_ts:
+                    logger.info(f"{self.symbol} is already up-to-date.")
                 else:
-                    current += self.candle_seconds
-                safety_counter += 1
+                    current = last_db_time or int(datetime(2011, 1, 1, tzinfo=timezone.utc).timestamp())
+                    # the stored bar at last_db_time is fetched and upserted again
+                    self.changed_since = last_db_time or None
+                    if end_ts - current > self.chunk_seconds:
+                        # Large gap (fresh table / long downtime) → pipelined backfill
+                        total_inserted = self.backfill(conn, current, end_ts)
+                    else:
+                        for df in self._iter_chunks(current, end_ts):
+                            total_inserted += self.batch_insert(conn, df)
 
-            logger.info(f"✅ {self.symbol} sync completed — total {total_inserted} records.")
+                closed = {}
+                newest = self.get_last_db_timestamp(conn)
+                if newest > last_db_time and self.timeframe_label:
+                    closed[self.timeframe_label] = newest
+                # Still run when up-to-date, so derived bars catch up after a failed sync
+                if self.aggregator is not None:
+                    self.aggregator.update(conn)
+                    closed.update(self.aggregator.last_closed)
+                conn.commit()  # one commit per sync, base + derived timeframes together
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"❌ {self.symbol} sync failed, rolled back: {e}")
+                return {}
+
+            if last_db_time < end_ts:
+                logger.info(
+                    f"✅ {self.symbol} sync completed — total {total_inserted} records "
+                    f"({self.last_sync_empty_round_trips} empty MT5 round trips)."
+                )
+            return closed
         finally:
             conn_ctx.__exit__(None, None, None)
+            self.sync_archive()
+
+    def backfill(self, conn, start_ts: int, end_ts: int) -> int:
+        """
+        Pipelined historical backfill: a producer thread pulls chunks from MT5
+        into a bounded queue while this thread writes them to the DB.
+        Progress is logged as the written range advances.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for df in self._iter_chunks(start_ts, end_ts):
+                    if stop.is_set():
+                        return
+                    chunks.put(df)
+            except Exception as e:
+                logger.error(f"Backfill fetch error for {self.symbol}: {e}")
+            finally:
+                chunks.put(None)
+
+        producer = threading.Thread(target=produce, name=f"backfill-{self.table_name}", daemon=True)
+        producer.start()
+        logger.info(
+            f"⏬ {self.symbol} backfill {self.table_name} from {datetime.utcfromtimestamp(start_ts)} "
+            f"to {datetime.utcfromtimestamp(end_ts)}"
+        )
+
+        total_inserted = 0
+        chunk_count = 0
+        started = datetime.utcnow()
+        try:
+            while True:
+                df = chunks.get()
+                if df is None:
+                    break
+                total_inserted += self._bulk_write(conn, df)
+                chunk_count += 1
+                if chunk_count % 10 == 0:
+                    self._log_progress(start_ts, end_ts, int(df["time"].max()), total_inserted, started)
+        finally:
+            # Unblock the producer if we stopped early
+            stop.set()
+            while producer.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+        logger.info(
+            f"✅ {self.symbol} backfill {self.table_name} done — {total_inserted} rows in "
+            f"{chunk_count} chunks ({(datetime.utcnow() - started).total_seconds():.1f}s)"
+        )
+        return total_inserted
+
+    def _bulk_write(self, conn, df) -> int:
+        """Backfill writer: LOAD DATA when the connection allows it, else multi-row upsert."""
+        if DB_CONFIG.get("allow_local_infile"):
+            try:
+                return self.load_data_insert(conn, df)
+            except Exception as e:
+                logger.warning(f"LOAD DATA failed ({e}), falling back to multi-row insert.")
+        return self.batch_insert(conn, df)
+
+    def _iter_chunks(self, start_ts: int, end_ts: int, max_probe_factor: int = 64, retries: int = 3):
+        """
+        Yield non-empty candle chunks from start_ts up to end_ts.
+
+        An empty reply means the whole [current, chunk_end] range has no bars
+        (weekend, holiday, before history starts), so we jump past it and
+        double the probe window on each consecutive miss. Closed-market gaps
+        cost O(log gap) MT5 calls instead of one call per candle.
+        An MT5 error is retried; if it persists the sync stops with RuntimeError,
+        so no range is skipped and the next sync fetches it again.
+        """
+        current = start_ts
+        probe_factor = 1
+        safety_counter = 0
+
+        while current < end_ts and safety_counter < 1_000_000:
+            chunk_end = min(current + self.chunk_seconds * probe_factor, end_ts)
+            df = self.fetch_chunk(current, chunk_end)
+            for attempt in range(1, retries + 1):
+                if df is not None:
+                    break
+                time.sleep(attempt)
+                df = self.fetch_chunk(current, chunk_end)
+            if df is None:
+                raise RuntimeError(
+                    f"MT5 fetch failed for {self.symbol} from {datetime.utcfromtimestamp(current)} "
+                    f"after {retries} retries"
+                )
+            if not df.empty:
+                yield df
+                current = int(df["time"].max()) + self.candle_seconds
+                probe_factor = 1
+            else:
+                self.empty_round_trips += 1
+                self.last_sync_empty_round_trips += 1
+                current = chunk_end
+                probe_factor = min(probe_factor * 2, max_probe_factor)
+            safety_counter += 1
+
+    def _log_progress(self, start_ts, end_ts, current_ts, total_inserted, started):
+        done = (current_ts - start_ts) / max(1, end_ts - start_ts)
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        rate = total_inserted / elapsed if elapsed > 0 else 0
+        logger.info(
+            f"⏳ {self.symbol} {self.table_name} backfill {done:.1%} — {total_inserted} rows "
+            f"(up to {datetime.utcfromtimestamp(current_ts)}, {rate:.0f} rows/s)"
+        )
+
+    def sync_archive(self):
+        """
+        Mirror newly stored candles into the local columnar archive (used for warm-up/backtests);
+        bars the sync upserted again are refreshed in the archive and the CandleStore.
+        """
+        if self.aggregator is not None:
+            self.aggregator.sync_archive()
+        if self.timeframe_label is None:
+            return
+        try:
+            sync_candle_caches(self.symbol, self.timeframe_label, since=self.changed_since)
+        except Exception as e:
+            logger.error(f"Archive sync failed for {self.symbol}-{self.timeframe_label}: {e}")
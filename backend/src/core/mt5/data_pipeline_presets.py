@@ -1,9 +1,67 @@
-from MetaTrader5 import TIMEFRAME_M15, TIMEFRAME_M30, TIMEFRAME_H1, TIMEFRAME_D1, TIMEFRAME_H4
+import MetaTrader5 as mt5
+from dataclasses import dataclass
+from src.core.db.ohlc_repository import TIMEFRAME_SECONDS, get_ohlc_table
 from src.core.mt5.data_fetcher import MT5DataFetcher
+from src.core.mt5.candle_aggregator import CandleAggregator, DerivedTimeframe
+
+
+@dataclass(frozen=True)
+class PipelineSpec:
+    """
+    One MT5 fetch loop: symbol/timeframe pulled from MT5 close_delay seconds after each
+    bar close, and at least every poll_interval seconds (catches bars MT5 published late).
+    `derived` timeframes are aggregated from it locally (same transaction).
+    table_name / derived_tables override the default ohlc_<symbol>_<tf>_data tables.
+    """
+    symbol: str
+    timeframe: str = "M15"
+    poll_interval: int = 60 * 3
+    close_delay: int = 5
+    derived: tuple[str, ...] = ("M30", "H1", "H4", "D1")
+    table_name: str = None
+    derived_tables: tuple[tuple[str, str], ...] = ()
+    verify_interval: int = 60 * 60
+    day_offset_seconds: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.symbol}-{self.timeframe}"
+
+    def table_for(self, timeframe: str) -> str:
+        if timeframe == self.timeframe and self.table_name:
+            return self.table_name
+        return dict(self.derived_tables).get(timeframe) or get_ohlc_table(self.symbol, timeframe)
+
+
+# Declarative registry — add a line here to track another instrument
+PIPELINE_REGISTRY: list[PipelineSpec] = [
+    PipelineSpec("XAUUSDc"),
+]
+
+
+def mt5_timeframe(timeframe: str) -> int:
+    """MT5 constant for a timeframe label (e.g. "H1" → mt5.TIMEFRAME_H1)."""
+    if timeframe not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return getattr(mt5, f"TIMEFRAME_{timeframe}")
+
+
+def build_aggregator(spec: PipelineSpec):
+    if not spec.derived:
+        return None
+    return CandleAggregator(
+        spec.symbol, spec.table_for(spec.timeframe), TIMEFRAME_SECONDS[spec.timeframe],
+        [
+            DerivedTimeframe(tf, spec.table_for(tf), mt5_timeframe(tf), TIMEFRAME_SECONDS[tf])
+            for tf in spec.derived
+        ],
+        day_offset_seconds=spec.day_offset_seconds,
+    )
+
+
+def build_fetcher(spec: PipelineSpec) -> MT5DataFetcher:
+    return MT5DataFetcher(
+        spec.symbol, spec.table_for(spec.timeframe), mt5_timeframe(spec.timeframe),
+        TIMEFRAME_SECONDS[spec.timeframe], aggregator=build_aggregator(spec),
+    )
 
-# Preconfigured fetchers
-data_fetcher_xauusdc_m15 = MT5DataFetcher("XAUUSDc", "ohlc_xauusdc_m15_data", TIMEFRAME_M15, 900)
-data_fetcher_xauusdc_m30 = MT5DataFetcher("XAUUSDc", "ohlc_xauusdc_m30_data", TIMEFRAME_M30, 1800)
-data_fetcher_xauusdc_h1  = MT5DataFetcher("XAUUSDc", "ohlc_xauusdc_h1_data",  TIMEFRAME_H1, 3600)
-data_fetcher_xauusdc_h4  = MT5DataFetcher("XAUUSDc", "ohlc_xauusdc_h4_data",  TIMEFRAME_H4, 14400)
-data_fetcher_xauusdc_d1  = MT5DataFetcher("XAUUSDc", "ohlc_xauusdc_d1_data",  TIMEFRAME_D1, 86400)
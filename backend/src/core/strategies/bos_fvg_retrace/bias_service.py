@@ -26,14 +26,15 @@ class BiasService:
     # ===================================================
     # Public Entrypoint
     # ===================================================
-    def run_step(self, symbol: str, bos_time_utc: datetime):
+    def run_step(self, symbol: str, bos_time_utc: datetime, candles=None):
         """
         Run bias computation for given BOS timestamp (UTC-based).
+        candles: M15 CandleSnapshot of the current tick (None → load from the candle cache).
         """
         try:
             self.logger.info(f"[BiasService] Running bias check for {symbol} at {bos_time_utc} UTC")
 
-            candles = self._get_candles(symbol)
+            candles = self._get_candles(symbol, candles)
             if candles is None or len(candles) < 1000:
                 self.logger.warning("Not enough candle data for bias analysis.")
                 return
@@ -70,12 +71,14 @@ class BiasService:
         except Exception as e:
             self.logger.exception(f"Error in BiasService.run_step: {e}")
 
-    def run_daily_analysis(self, symbol: str):
+    def run_daily_analysis(self, symbol: str, candles=None):
         """
         Run bias update once per day for all sessions.
         Uses the most recent candle timestamp as reference.
+        candles: M15 CandleSnapshot of the current tick (None → load from the candle cache).
         """
-        candles = self._get_candles(symbol)
+        snapshot = candles
+        candles = self._get_candles(symbol, snapshot)
         if candles is None or len(candles) == 0:
             self.logger.warning("No candle data available for daily bias.")
             return
@@ -94,7 +97,7 @@ class BiasService:
         )
 
         self.logger.info(f"Running daily market bias update for {symbol} ({bos_time_utc.date()})")
-        self.run_step(symbol, bos_time_utc)
+        self.run_step(symbol, bos_time_utc, candles=snapshot)
 
 
     @staticmethod
@@ -166,11 +169,6 @@ class BiasService:
         window_df = df[(df["timestamp"] >= start_time) & (df["timestamp"] < bos_time_utc)]
         session_df = window_df[window_df["timestamp"].dt.hour.between(hours["start"], hours["end"])].copy()
 
-        # 🔹 Ensure numeric types (avoid Decimal)
-        for col in ["open", "high", "low", "close"]:
-            if col in session_df.columns:
-                session_df[col] = session_df[col].astype(float)
-
         session_df.loc[:, "return"] = session_df["close"].pct_change()
         session_df = session_df.dropna()
 
@@ -288,7 +286,11 @@ class BiasService:
     # ===================================================
     # Helpers
     # ===================================================
-    def _get_candles(self, symbol):
+    def _get_candles(self, symbol, candles=None):
+        if candles is not None:
+            df = candles.frame()
+            df["timestamp"] = df["time"].dt.tz_localize("UTC")
+            return df
         if symbol == "XAUUSDc":
             df = get_data_m15_xauusdc()
         else:
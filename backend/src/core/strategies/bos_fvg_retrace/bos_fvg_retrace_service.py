@@ -1,5 +1,6 @@
 # src/core/strategies/bos_fvg_retrace/bos_fvg_retrace_service.py
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+import os
+from src.core.db.candle_snapshot import CandleSnapshot
 from datetime import datetime
 from src.utils.logger import get_logger
 from src.core.strategies.bos_fvg_retrace.structure_service import StructureService
@@ -12,6 +13,9 @@ from src.core.strategies.bos_fvg_retrace.bias_service import BiasService
 # from src.core.strategies.bos_fvg_retrace.state_service import StateService
 import pandas as pd
 
+# "loose" (close beyond the previous candle) or "strict" (close beyond a confirmed swing, checkpointed)
+STRUCTURE_MODE = os.getenv("BOS_STRUCTURE_MODE", "loose")
+
 class BosFvgRetraceService:
     """
     Central orchestrator for BOS-FVG-Retrace strategy.
@@ -20,7 +24,7 @@ class BosFvgRetraceService:
 
     def __init__(self):
         self.logger = get_logger("BosFvgRetraceService")
-        self.structure_service = StructureService()
+        self.structure_service = StructureService(mode=STRUCTURE_MODE)
         self.fvg_service = FVGService()
         self.retrace_service = RetraceService()
         self.entry_service = EntryService()
@@ -28,23 +32,19 @@ class BosFvgRetraceService:
         self.bias_service = BiasService()
         self.last_bias_run_date = None
         # self.state_service = StateService()
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(300).reset_index(drop=True)
+    def _take_snapshot(self, symbol, timeframe):
+        """The tick's only candle read: one immutable snapshot shared by every sub-service."""
+        return CandleSnapshot.take(symbol, timeframe)
+
     def run(self, symbol: str, timeframe: str):
         """
         Main orchestration entry point.
         To be triggered every new candle close.
         """
         self.logger.info(f"🚀 Running BOS-FVG-Retrace pipeline for {symbol}-{timeframe}")
-        df = self._get_recent_candles(symbol, timeframe)
-        if df is None or len(df) < 10:
+        candles = self._take_snapshot(symbol, timeframe)
+        if len(candles) < 10:
             return
-        if "time" in df.columns:
-            df["timestamp"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
         # from src.core.mt5.get_data_helper import  get_data_m15_xauusdc_mt5
         
         # real_data = get_data_m15_xauusdc_mt5()
@@ -60,18 +60,19 @@ class BosFvgRetraceService:
             today_utc = datetime.utcnow().date()
             if self.last_bias_run_date != today_utc:
                 self.logger.info("[BiasService] Running daily bias update (auto-trigger).")
-                self.bias_service.run_daily_analysis(symbol)
+                # Bias is computed on M15; reuse the snapshot only when it is M15
+                self.bias_service.run_daily_analysis(symbol, candles=candles if timeframe == "M15" else None)
                 self.last_bias_run_date = today_utc
             # 1️⃣ Structure Detection
-            self.structure_service.run_step(symbol, timeframe)
+            self.structure_service.run_step(symbol, timeframe, candles=candles)
 
             # 2️⃣ FVG Detection (to be implemented later)
-            self.fvg_service.run_step(symbol, timeframe)
+            self.fvg_service.run_step(symbol, timeframe, candles=candles)
 
             # 3️⃣ Retrace Detection (to be implemented later)
-            self.retrace_service.run_step(symbol, timeframe)
+            self.retrace_service.run_step(symbol, timeframe, candles=candles)
 
-            self.entry_service.run_step(symbol, timeframe)
+            self.entry_service.run_step(symbol, timeframe, candles=candles)
 
             self.entry_to_signal_service.run_step(symbol, timeframe)
 
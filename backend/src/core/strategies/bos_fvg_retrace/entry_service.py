@@ -5,7 +5,7 @@ import numpy as np
 from datetime import datetime
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.candle_snapshot import CandleSnapshot
 
 
 class EntryService:
@@ -23,10 +23,11 @@ class EntryService:
     # =========================================================
     # MAIN ENTRY
     # =========================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, candles=None):
         """
         Called after retrace stage. Finds FVGs that were mitigated
         but not yet turned into trade entries.
+        candles: the tick's CandleSnapshot (None → load from the candle cache).
         """
         try:
             fvgs = self._get_mitigated_fvgs_without_entry(symbol, timeframe)
@@ -35,7 +36,7 @@ class EntryService:
                 return
 
             for fvg in fvgs:
-                self._create_entry(symbol, timeframe, fvg)
+                self._create_entry(symbol, timeframe, fvg, candles)
 
         except Exception as e:
             self.logger.exception(f"Error in EntryService.run_step: {e}")
@@ -43,13 +44,13 @@ class EntryService:
     # =========================================================
     # CORE LOGIC
     # =========================================================
-    def _create_entry(self, symbol, timeframe, fvg):
+    def _create_entry(self, symbol, timeframe, fvg, candles=None):
         """
         Create an entry, SL, and TP using ATR-based distance.
         Entry is based on the close of the mitigation candle.
         """
         # 1️⃣ Fetch recent candles ending at the mitigation candle
-        df = self._get_recent_candles(symbol, timeframe, end_time=fvg["mitigated_at"], lookback=100)
+        df = self._get_recent_candles(symbol, timeframe, end_time=fvg["mitigated_at"], lookback=100, candles=candles)
         if df is None or len(df) < self.ATR_PERIOD:
             self.logger.warning(f"⚠️ Not enough candles to calculate ATR for FVG {fvg['id']}")
             return
@@ -121,25 +122,12 @@ class EntryService:
     # =========================================================
     # DATA HELPERS
     # =========================================================
-    def _get_recent_candles(self, symbol, timeframe, end_time, lookback=100):
+    def _get_recent_candles(self, symbol, timeframe, end_time, lookback=100, candles=None):
         """Fetch candles ending exactly at the retrace candle (mitigated_at)."""
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data source for {symbol}-{timeframe}")
-
-        # ✅ Convert from UNIX timestamp → datetime
-        if pd.api.types.is_integer_dtype(df["time"]):
-            df["time"] = pd.to_datetime(df["time"], unit="s")
-        else:
-            df["time"] = pd.to_datetime(df["time"])
-
-        # ✅ Align mitigated_at as datetime
-        end_time = pd.to_datetime(end_time)
-
-        # ✅ Get up to the candle that existed before or at mitigated_at
-        df = df[df["time"] <= end_time].sort_values("time").tail(lookback).reset_index(drop=True)
-
+        if candles is None:
+            candles = CandleSnapshot.take(symbol, timeframe)
+        # ✅ Up to the candle that existed before or at mitigated_at
+        df = candles.until(end_time, lookback)
         return df if not df.empty else None
 
     def _calculate_atr(self, df, period=14):
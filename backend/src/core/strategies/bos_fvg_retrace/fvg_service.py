@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.candle_snapshot import CandleSnapshot
 
 
 class FVGStatus(str, Enum):
@@ -23,9 +23,10 @@ class FVGService:
     # =========================================================
     # MAIN ENTRY
     # =========================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, candles=None):
         """
         Step function that processes BOS events incrementally.
+        candles: the tick's CandleSnapshot (None → load from the candle cache).
         """
         try:
             bos_events = self._get_pending_bos(symbol, timeframe)
@@ -34,7 +35,7 @@ class FVGService:
                 return
 
             for bos in bos_events:
-                self._process_bos_event(symbol, timeframe, bos)
+                self._process_bos_event(symbol, timeframe, bos, candles)
 
         except Exception as e:
             self.logger.exception(f"Error in FVGService.run_step: {e}")
@@ -42,7 +43,7 @@ class FVGService:
     # =========================================================
     # INTERNAL LOGIC
     # =========================================================
-    def _process_bos_event(self, symbol, timeframe, bos_event):
+    def _process_bos_event(self, symbol, timeframe, bos_event, candles=None):
         """
         Progressively check if an FVG forms after a BOS event.
         Keeps scanning until MAX_CANDLES are reached.
@@ -52,7 +53,7 @@ class FVGService:
         prev_checked = bos_event.get("candles_checked", 0)
 
         # Load candles
-        df = self._get_candles_after(symbol, timeframe, bos_time, n=self.MAX_CANDLES)
+        df = self._get_candles_after(symbol, timeframe, bos_time, n=self.MAX_CANDLES, candles=candles)
         if df is None or df.empty:
             self.logger.info(f"⚠️ No candles found after BOS at {bos_time}")
             return
@@ -104,23 +105,24 @@ class FVGService:
           - Bullish: c0.high < c2.low
           - Bearish: c0.low > c2.high
         """
+        # Work on the float64 columns directly instead of boxing a row per candle
+        highs, lows, times = df["high"].to_numpy(), df["low"].to_numpy(), df["time"]
         for i in range(2, len(df)):
-            c0, c1, c2 = df.iloc[i - 2], df.iloc[i - 1], df.iloc[i]
-            if direction == "bullish" and c0["high"] < c2["low"]:
+            if direction == "bullish" and highs[i - 2] < lows[i]:
                 return {
                     "direction": "bullish",
-                    "gap_low": float(c0["high"]),
-                    "gap_high": float(c2["low"]),
-                    "start_time": c0["time"],
-                    "end_time": c2["time"],
+                    "gap_low": float(highs[i - 2]),
+                    "gap_high": float(lows[i]),
+                    "start_time": times.iloc[i - 2],
+                    "end_time": times.iloc[i],
                 }
-            elif direction == "bearish" and c0["low"] > c2["high"]:
+            elif direction == "bearish" and lows[i - 2] > highs[i]:
                 return {
                     "direction": "bearish",
-                    "gap_low": float(c2["high"]),
-                    "gap_high": float(c0["low"]),
-                    "start_time": c0["time"],
-                    "end_time": c2["time"],
+                    "gap_low": float(highs[i]),
+                    "gap_high": float(lows[i - 2]),
+                    "start_time": times.iloc[i - 2],
+                    "end_time": times.iloc[i],
                 }
         return None
 
@@ -199,25 +201,9 @@ class FVGService:
     # =========================================================
     # DATA HELPERS
     # =========================================================
-    def _get_candles_after(self, symbol, timeframe, start_time, n=10):
+    def _get_candles_after(self, symbol, timeframe, start_time, n=10, candles=None):
         """Return up to n candles after BOS candle_time"""
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data source for {symbol}-{timeframe}")
-
-        # Normalize timestamps
-        if pd.api.types.is_integer_dtype(df["time"]):
-            df["time"] = pd.to_datetime(df["time"], unit="s")
-        else:
-            df["time"] = pd.to_datetime(df["time"])
-        df = df.sort_values("time").reset_index(drop=True)
-
-        # Convert start_time type
-        if isinstance(start_time, (int, float)):
-            start_time = datetime.fromtimestamp(start_time)
-        elif isinstance(start_time, str):
-            start_time = pd.to_datetime(start_time)
-
-        df = df[df["time"] > start_time].head(n + 2).reset_index(drop=True)
+        if candles is None:
+            candles = CandleSnapshot.take(symbol, timeframe)
+        df = candles.after(start_time, n + 2)
         return df if not df.empty else None
@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.candle_snapshot import CandleSnapshot
 
 
 class RetraceStatus(str, Enum):
@@ -22,9 +22,10 @@ class RetraceService:
     # =========================================================
     # MAIN ENTRY
     # =========================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, candles=None):
         """
         Periodically called — polls DB for active FVG zones and checks retrace.
+        candles: the tick's CandleSnapshot (None → load from the candle cache).
         """
         try:
             fvgs = self._get_pending_fvgs(symbol, timeframe)
@@ -33,7 +34,7 @@ class RetraceService:
                 return
 
             for fvg in fvgs:
-                self._process_fvg(symbol, timeframe, fvg)
+                self._process_fvg(symbol, timeframe, fvg, candles)
 
         except Exception as e:
             self.logger.exception(f"Error in RetraceService.run_step: {e}")
@@ -41,7 +42,7 @@ class RetraceService:
     # =========================================================
     # CORE LOGIC
     # =========================================================
-    def _process_fvg(self, symbol, timeframe, fvg):
+    def _process_fvg(self, symbol, timeframe, fvg, candles=None):
         """
         For each FVG zone, check if price has re-entered (mitigated)
         or if it should be expired.
@@ -51,7 +52,7 @@ class RetraceService:
         gap_low = float(fvg["gap_low"])
         gap_high = float(fvg["gap_high"])
 
-        df = self._get_candles_after(symbol, timeframe, start_time, n=self.MAX_CANDLES)
+        df = self._get_candles_after(symbol, timeframe, start_time, n=self.MAX_CANDLES, candles=candles)
         if df is None or df.empty:
             self.logger.info(f"⚠️ No candles found after FVG at {start_time}")
             return
@@ -158,25 +159,9 @@ class RetraceService:
     # =========================================================
     # DATA HELPERS
     # =========================================================
-    def _get_candles_after(self, symbol, timeframe, start_time, n=15):
+    def _get_candles_after(self, symbol, timeframe, start_time, n=15, candles=None):
         """Return up to n candles after FVG was created."""
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data source for {symbol}-{timeframe}")
-
-        # Normalize timestamps
-        if pd.api.types.is_integer_dtype(df["time"]):
-            df["time"] = pd.to_datetime(df["time"], unit="s")
-        else:
-            df["time"] = pd.to_datetime(df["time"])
-        df = df.sort_values("time").reset_index(drop=True)
-
-        # Convert start_time
-        if isinstance(start_time, (int, float)):
-            start_time = datetime.fromtimestamp(start_time)
-        elif isinstance(start_time, str):
-            start_time = pd.to_datetime(start_time)
-
-        df = df[df["time"] > start_time].head(n).reset_index(drop=True)
+        if candles is None:
+            candles = CandleSnapshot.take(symbol, timeframe)
+        df = candles.after(start_time, n)
         return df if not df.empty else None
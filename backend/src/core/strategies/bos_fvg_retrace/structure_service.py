@@ -1,209 +1,204 @@
 # src/core/strategies/bos_fvg_retrace/structure_service.py
 
+import copy
+import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
+from src.core.db.candle_snapshot import CandleSnapshot
+from src.core.strategies.bos_fvg_retrace.structure_tracker import StructureCheckpoint
 
 class StructureService:
-    def __init__(self, mode="loose"):
+    SWING_LOG_SAMPLE = 20  # strict mode: log 1 in N swings at DEBUG
+
+    def __init__(self, mode="loose", checkpoint=None):
         """
         mode = 'loose' or 'strict'
         loose  → record BOS when candle close breaks previous candle high/low
-        strict → record BOS when close breaks confirmed swing high/low
+        strict → record BOS when close breaks confirmed swing high/low;
+                 the structure state is checkpointed (StructureCheckpoint) and
+                 each run only processes candles after the checkpoint
         """
         self.mode = mode
         self.logger = get_logger("StructureService")
+        self.checkpoint = checkpoint or StructureCheckpoint()
+        self._trackers = {}
+        # None = not checked yet; see _has_bos_unique_key
+        self._unique_key = None
 
     # ===================================================
     # Public entrypoint
     # ===================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, candles=None):
+        """candles: the tick's CandleSnapshot (None → read the last 300 candles)."""
         try:
-            df = self._get_recent_candles(symbol, timeframe)
+            if self.mode == "strict":
+                self._run_strict(symbol, timeframe, candles)
+                return
+
+            df = self._get_recent_candles(symbol, timeframe, candles=candles)
             if df is None or len(df) < 10:
                 return
 
 
             df = self._prepare_candles(df)
 
-            if self.mode == "loose":
-                bos_events = self._detect_bos_loose(df)
-            else:
-                bos_events = self._detect_bos_strict(df)
-
+            bos_events = self._detect_bos_loose(df)
             self._save_new_bos(symbol, timeframe, bos_events)
 
         except Exception as e:
             self.logger.exception(f"Error in StructureService.run_step: {e}")
 
+    def _run_strict(self, symbol, timeframe, candles=None):
+        """
+        Resume the strict structure tracker from its checkpoint and feed it only
+        the candles after it (the newest 300 on a cold start). The checkpoint is
+        advanced after the BOS rows are saved, so a failed save is retried next tick.
+        """
+        if candles is None:
+            candles = CandleSnapshot.take(symbol, timeframe)
+        if len(candles) < 10:
+            return
+
+        key = (symbol, timeframe)
+        if key not in self._trackers:
+            self._trackers[key] = self.checkpoint.load(symbol, timeframe)
+        tracker = copy.deepcopy(self._trackers[key])
+
+        swings = []
+        bos_events = tracker.update(candles.candles, on_swing=lambda *swing: swings.append(swing))
+        self._log_swings_sampled(swings)
+        self._save_new_bos(symbol, timeframe, bos_events)
+        self.checkpoint.save(symbol, timeframe, tracker)
+        self._trackers[key] = tracker
+        self.logger.info(f"[Strict Mode] structure={tracker.state}, found {len(bos_events)} new BOS events")
+
     # ===================================================
     # Core BOS Logic
     # ===================================================
 
     def _detect_bos_loose(self, df: pd.DataFrame):
         """Detect BOS instantly when candle closes beyond previous high/low"""
-        bos_events = []
+        close = df["close"].to_numpy(dtype=np.float64)
+        high = df["high"].to_numpy(dtype=np.float64)
+        low = df["low"].to_numpy(dtype=np.float64)
 
-        for i in range(1, len(df)):
-            prev = df.iloc[i - 1]
-            curr = df.iloc[i]
+        # Bullish BOS: close breaks previous high; bearish: close breaks previous low
+        bullish = close[1:] > high[:-1]
+        bearish = ~bullish & (close[1:] < low[:-1])
+        idx = np.flatnonzero(bullish | bearish) + 1
 
-            # Bullish BOS: close breaks previous high
-            if curr["close"] > prev["high"]:
+        bos_events = []
+        for i, candle_time in zip(idx.tolist(), df["timestamp"].iloc[idx].tolist()):
+            if bullish[i - 1]:
                 bos_events.append({
                     "type": "BOS_HIGH",
                     "direction": "bullish",
-                    "broken_price": float(prev["high"]),
-                    "candle_time": curr["timestamp"],
+                    "broken_price": float(high[i - 1]),
+                    "candle_time": candle_time,
                 })
-
-            # Bearish BOS: close breaks previous low
-            elif curr["close"] < prev["low"]:
+            else:
                 bos_events.append({
                     "type": "BOS_LOW",
                     "direction": "bearish",
-                    "broken_price": float(prev["low"]),
-                    "candle_time": curr["timestamp"],
+                    "broken_price": float(low[i - 1]),
+                    "candle_time": candle_time,
                 })
 
         self.logger.info(f"[Loose Mode] Found {len(bos_events)} BOS events")
         return bos_events
 
-    def _detect_bos_strict(self, df: pd.DataFrame, window_size=3):
-        bos_events = []
-
-        highs, lows = df["high"].values, df["low"].values
-        timestamps = df["timestamp"].values
-
-        # Identify swing highs/lows
-        swing_highs = []
-        swing_lows = []
-        for i in range(window_size, len(df) - window_size):
-            if highs[i] == max(highs[i - window_size:i + window_size + 1]):
-                swing_highs.append((i, highs[i]))
-                self.logger.info(f"high :{df.iloc[i]['high'], df.iloc[i]['timestamp']}")
-            if lows[i] == min(lows[i - window_size:i + window_size + 1]):
-                swing_lows.append((i, lows[i]))
-                self.logger.info(f"low {df.iloc[i]['low'], df.iloc[i]['timestamp']}")
-        
-        # ===== Structure tracking =====
-        structure_state = None
-        last_higher_low = None
-        last_lower_high = None
-
-        for i in range(window_size, len(df)):
-            curr_close = df.iloc[i]["close"]
-            curr_time = df.iloc[i]["timestamp"]
-
-            # 1️⃣ Establish initial direction if none
-            if structure_state is None and len(swing_highs) > 1 and len(swing_lows) > 1:
-                if swing_highs[1][1] > swing_highs[0][1] and swing_lows[1][1] > swing_lows[0][1]:
-                    structure_state = "bullish"
-                    last_higher_low = swing_lows[1][1]
-                    self.logger.info(f"Initial structure: {structure_state} and last higher low: {last_higher_low}")
-                elif swing_highs[1][1] < swing_highs[0][1] and swing_lows[1][1] < swing_lows[0][1]:
-                    structure_state = "bearish"
-                    last_lower_high = swing_highs[1][1]
-                    self.logger.info(f"Initial structure: {structure_state} and last lower high: {last_lower_high}")
-                continue  # move on to next candle
-
-            # 2️⃣ If structure is bullish → look for break below last higher low
-            if structure_state == "bullish" and last_higher_low:
-                if curr_close < last_higher_low:
-                    bos_events.append({
-                        "type": "BOS_LOW",
-                        "direction": "bearish",
-                        "broken_price": float(last_higher_low),
-                        "candle_time": curr_time,
-                    })
-                    # flip structure
-                    structure_state = "bearish"
-                    # set new protected high (most recent swing high before this break)
-                    recent_highs = [h for (idx, h) in swing_highs if idx < i]
-                    if recent_highs:
-                        last_lower_high = recent_highs[-1]
-
-            # 3️⃣ If structure is bearish → look for break above last lower high
-            elif structure_state == "bearish" and last_lower_high:
-                if curr_close > last_lower_high:
-                    bos_events.append({
-                        "type": "BOS_HIGH",
-                        "direction": "bullish",
-                        "broken_price": float(last_lower_high),
-                        "candle_time": curr_time,
-                    })
-                    # flip structure
-                    structure_state = "bullish"
-                    # set new protected low (most recent swing low before this break)
-                    recent_lows = [l for (idx, l) in swing_lows if idx < i]
-                    if recent_lows:
-                        last_higher_low = recent_lows[-1]
-
-        self.logger.info(f"[Strict Mode Improved] Found {len(bos_events)} BOS events")
-        return bos_events
+    def _log_swings_sampled(self, swings):
+        """DEBUG only: every SWING_LOG_SAMPLE-th confirmed swing, instead of each one at INFO."""
+        if not swings or not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        for swing_type, price, epoch in swings[::self.SWING_LOG_SAMPLE]:
+            self.logger.debug(f"{swing_type} :{price, pd.Timestamp(epoch, unit='s')}")
+        self.logger.debug(f"{len(swings)} new swings (1 in {self.SWING_LOG_SAMPLE} logged)")
 
     # ===================================================
     # Database save
     # ===================================================
 
-    def _save_new_bos(self, symbol, timeframe, bos_events):
+    def _save_new_bos(self, symbol, timeframe, bos_events, rows_per_statement=1000):
+        """
+        Write all BOS events with multi-row INSERT IGNORE; duplicates are dropped by
+        UNIQUE(symbol, timeframe, type, candle_time). If the table lacks that key,
+        already stored events are filtered with one SELECT. Returns the number of new rows.
+        """
         if not bos_events:
-            return
+            return 0
+
+        now = datetime.utcnow()
+        rows = [
+            (symbol, timeframe, bos["type"], bos["direction"], bos["broken_price"], bos["candle_time"], now, "pending")
+            for bos in bos_events
+        ]
 
+        inserted = 0
         with get_connection() as conn:
             cursor = conn.cursor()
+            try:
+                new_rows = rows if self._has_bos_unique_key(cursor) else self._filter_stored(cursor, rows)
+                for i in range(0, len(new_rows), rows_per_statement):
+                    batch = new_rows[i:i + rows_per_statement]
+                    cursor.execute(f"""
+                        INSERT IGNORE INTO strategy_bos_fvg_retrace_structure_events
+                        (symbol, timeframe, type, direction, broken_price, candle_time, created_at, processed_by_fvg)
+                        VALUES {", ".join(["(%s,%s,%s,%s,%s,%s,%s,%s)"] * len(batch))}
+                    """, [value for row in batch for value in row])
+                    inserted += cursor.rowcount
+            finally:
+                cursor.close()
+            conn.commit()
 
-            for bos in bos_events:
-                # Check if already exists
-                cursor.execute(
-                    """
-                    SELECT id FROM strategy_bos_fvg_retrace_structure_events
-                    WHERE symbol=%s AND timeframe=%s AND type=%s AND candle_time=%s
-                    """,
-                    (symbol, timeframe, bos["type"], bos["candle_time"]),
-                )
-                if cursor.fetchone():
-                    continue  # Skip duplicate
-
-                # Insert new BOS
-                cursor.execute(
-                    """
-                    INSERT INTO strategy_bos_fvg_retrace_structure_events
-                    (symbol, timeframe, type, direction, broken_price, candle_time, created_at, processed_by_fvg)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, "pending")
-                    """,
-                    (
-                        symbol,
-                        timeframe,
-                        bos["type"],
-                        bos["direction"],
-                        bos["broken_price"],
-                        bos["candle_time"],
-                        datetime.utcnow(),
-                    ),
+        if inserted:
+            self.logger.info(f"Inserted {inserted} new BOS into DB ({len(rows) - inserted} already stored)")
+        return inserted
+
+    def _has_bos_unique_key(self, cursor):
+        if self._unique_key is None:
+            cursor.execute("SHOW INDEX FROM strategy_bos_fvg_retrace_structure_events WHERE Non_unique = 0")
+            columns = {}
+            for row in cursor.fetchall():
+                # SHOW INDEX: Key_name is column 2, Column_name column 4
+                columns.setdefault(row[2], set()).add(row[4])
+            self._unique_key = {"symbol", "timeframe", "type", "candle_time"} in columns.values()
+            if not self._unique_key:
+                self.logger.warning(
+                    "strategy_bos_fvg_retrace_structure_events has no UNIQUE(symbol, timeframe, type, candle_time); "
+                    "falling back to SELECT-based dedup. Add it with: ALTER TABLE strategy_bos_fvg_retrace_structure_events "
+                    "ADD UNIQUE KEY uq_structure_event (symbol, timeframe, type, candle_time)"
                 )
-
-            conn.commit()
-            self.logger.info(f"Inserted new BOS (deduped) into DB")
+        return self._unique_key
+
+    @staticmethod
+    def _filter_stored(cursor, rows):
+        """Drop rows already stored (one range SELECT for the batch)."""
+        symbol, timeframe = rows[0][0], rows[0][1]
+        times = [row[5] for row in rows]
+        cursor.execute("""
+            SELECT type, candle_time FROM strategy_bos_fvg_retrace_structure_events
+            WHERE symbol=%s AND timeframe=%s AND candle_time BETWEEN %s AND %s
+        """, (symbol, timeframe, min(times), max(times)))
+        stored = {(bos_type, pd.Timestamp(candle_time)) for bos_type, candle_time in cursor.fetchall()}
+        return [row for row in rows if (row[2], pd.Timestamp(row[5])) not in stored]
 
     # ===================================================
     # Helpers
     # ===================================================
 
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(300).reset_index(drop=True)
+    def _get_recent_candles(self, symbol, timeframe, limit=300, candles=None):
+        if candles is not None:
+            return candles.tail(limit)
+        return fetch_candles(symbol, timeframe, limit=limit)
 
     def _prepare_candles(self, df):
         if "timestamp" not in df.columns:
-            if "time" in df.columns:
-                df["timestamp"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-            else:
-                df["timestamp"] = df.iloc[:, 0].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-        df["timestamp"] = df["timestamp"].apply(lambda x: x.replace(microsecond=0))
+            seconds = df["time"] if "time" in df.columns else df.iloc[:, 0]
+            df["timestamp"] = pd.to_datetime(seconds.astype("int64"), unit="s")
+        df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.floor("s")
         return df
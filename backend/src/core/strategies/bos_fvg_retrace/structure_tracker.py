@@ -0,0 +1,175 @@
+# src/core/strategies/bos_fvg_retrace/structure_tracker.py
+import os
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field, asdict, fields
+from pathlib import Path
+from src.core.strategies.swing_point_fib.swing_engine import detect_strict_swings
+
+# Relative paths resolve against backend/, not the process working directory
+BACKEND_DIR = Path(__file__).resolve().parents[4]
+STRUCTURE_STATE_DIR = BACKEND_DIR / os.getenv("STRUCTURE_STATE_DIR", "data/structure")
+
+
+@dataclass
+class StrictStructureTracker:
+    """
+    Resumable strict-mode market structure (BOS on confirmed swings).
+
+    Candles are processed once, in order. A swing at index c is known from
+    candle c + window_size on (when its window is complete), so every BOS
+    uses the same swings it would have used live and output does not depend
+    on where a tick's window starts.
+    - no state yet   → wait for 2 swing highs and 2 swing lows; bullish if both the
+                       later high and low are higher, bearish if both are lower
+                       (otherwise keep the latest two and retry on the next swing)
+    - bullish        → close < last_higher_low is a bearish BOS; flip, the protected
+                       high becomes the latest confirmed swing high
+    - bearish        → close > last_lower_high is a bullish BOS; flip, the protected
+                       low becomes the latest confirmed swing low
+    """
+
+    window_size: int = 3
+    last_time: int = None            # epoch of the last processed candle
+    state: str = None                # None / "bullish" / "bearish"
+    last_higher_low: float = None
+    last_lower_high: float = None
+    last_swing_high: float = None
+    last_swing_low: float = None
+    pending_highs: list = field(default_factory=list)   # swings seen before the state is known
+    pending_lows: list = field(default_factory=list)
+
+    def update(self, candles, cold_start=300, on_swing=None) -> list[dict]:
+        """
+        Process candles (columnar Candles, ascending) newer than last_time.
+        Without a checkpoint, starts from the newest `cold_start` candles.
+        on_swing(swing_type, price, epoch) is called for each newly confirmed swing.
+        Returns the BOS events found, oldest first.
+        """
+        n = len(candles)
+        if n == 0:
+            return []
+        times = candles.time
+        if self.last_time is None:
+            pos = max(0, n - cold_start)
+        else:
+            pos = int(np.searchsorted(times, self.last_time, side="right"))
+        if pos >= n:
+            return []
+
+        # 2 * window_size candles of context so swings confirmed by new candles are complete
+        w = self.window_size
+        ctx = max(0, pos - 2 * w)
+        highs = np.asarray(candles.high[ctx:], dtype=np.float64)
+        lows = np.asarray(candles.low[ctx:], dtype=np.float64)
+        closes = candles.close[ctx:].tolist()
+        high_idx, low_idx = detect_strict_swings(highs, lows, w)
+        # swing centre c is confirmed on candle c + w; index them by that candle
+        high_at = {int(c) + w: (float(highs[c]), int(times[ctx + c])) for c in high_idx}
+        low_at = {int(c) + w: (float(lows[c]), int(times[ctx + c])) for c in low_idx}
+
+        events = []
+        for j in range(pos - ctx, len(closes)):
+            for swing_type, swings in (("high", high_at), ("low", low_at)):
+                if j in swings:
+                    price, epoch = swings[j]
+                    self._add_swing(swing_type, price)
+                    if on_swing:
+                        on_swing(swing_type, price, epoch)
+
+            if self.state is None:
+                self._establish()
+                continue  # the candle that sets the initial state is not checked for a break
+
+            event = self._check_break(closes[j], int(times[ctx + j]))
+            if event:
+                events.append(event)
+
+        self.last_time = int(times[-1])
+        return events
+
+    # ===================================================
+    # Internal
+    # ===================================================
+    def _add_swing(self, swing_type, price):
+        if swing_type == "high":
+            self.last_swing_high = price
+            if self.state is None:
+                self.pending_highs = (self.pending_highs + [price])[-2:]
+        else:
+            self.last_swing_low = price
+            if self.state is None:
+                self.pending_lows = (self.pending_lows + [price])[-2:]
+
+    def _establish(self):
+        if len(self.pending_highs) < 2 or len(self.pending_lows) < 2:
+            return
+        (h0, h1), (l0, l1) = self.pending_highs, self.pending_lows
+        if h1 > h0 and l1 > l0:
+            self.state, self.last_higher_low = "bullish", l1
+        elif h1 < h0 and l1 < l0:
+            self.state, self.last_lower_high = "bearish", h1
+        else:
+            return
+        self.pending_highs, self.pending_lows = [], []
+
+    def _check_break(self, close, epoch):
+        if self.state == "bullish" and self.last_higher_low:
+            if close < self.last_higher_low:
+                event = self._event("BOS_LOW", "bearish", self.last_higher_low, epoch)
+                self.state = "bearish"
+                if self.last_swing_high is not None:
+                    self.last_lower_high = self.last_swing_high
+                return event
+        elif self.state == "bearish" and self.last_lower_high:
+            if close > self.last_lower_high:
+                event = self._event("BOS_HIGH", "bullish", self.last_lower_high, epoch)
+                self.state = "bullish"
+                if self.last_swing_low is not None:
+                    self.last_higher_low = self.last_swing_low
+                return event
+        return None
+
+    @staticmethod
+    def _event(bos_type, direction, price, epoch):
+        return {
+            "type": bos_type,
+            "direction": direction,
+            "broken_price": float(price),
+            "candle_time": pd.Timestamp(epoch, unit="s"),
+        }
+
+
+class StructureCheckpoint:
+    """
+    StrictStructureTracker checkpoints as JSON files:
+    <root>/<symbol>_<timeframe>_strict.json. Written via a temp file + rename,
+    so a crash never leaves a half-written checkpoint.
+    """
+
+    def __init__(self, root: Path = STRUCTURE_STATE_DIR):
+        self.root = Path(root)
+
+    def load(self, symbol: str, timeframe: str, window_size: int = 3) -> StrictStructureTracker:
+        """Saved tracker, or a fresh one (no file, unreadable file, other window size)."""
+        path = self._path(symbol, timeframe)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            known = {f.name for f in fields(StrictStructureTracker)}
+            tracker = StrictStructureTracker(**{k: v for k, v in data.items() if k in known})
+            if tracker.window_size == window_size:
+                return tracker
+        except (OSError, ValueError, TypeError):
+            pass
+        return StrictStructureTracker(window_size=window_size)
+
+    def save(self, symbol: str, timeframe: str, tracker: StrictStructureTracker):
+        path = self._path(symbol, timeframe)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(tracker)), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _path(self, symbol, timeframe) -> Path:
+        return self.root / f"{symbol}_{timeframe}_strict.json"
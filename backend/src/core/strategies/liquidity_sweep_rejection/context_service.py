@@ -4,12 +4,7 @@ import pandas as pd
 from datetime import datetime, timedelta, timezone
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import (
-    get_data_m15_xauusdc,
-    get_data_h1_xauusdc,
-    get_data_h4_xauusdc,
-    get_data_d1_xauusdc,
-)
+from src.core.db.ohlc_repository import fetch_candles
 
 
 class ContextService:
@@ -253,13 +248,9 @@ class ContextService:
         if symbol != "XAUUSDc":
             raise ValueError(f"No data getter for {symbol}")
 
-        if timeframe == "M15":
-            return get_data_m15_xauusdc().tail(300).reset_index(drop=True)
-        elif timeframe == "H1":
-            return get_data_h1_xauusdc().tail(300).reset_index(drop=True)
-        elif timeframe == "H4":
-            return get_data_h4_xauusdc().tail(300).reset_index(drop=True)
+        if timeframe in ("M15", "H1", "H4"):
+            return fetch_candles(symbol, timeframe, limit=300)
         elif timeframe == "D1":
-            return get_data_d1_xauusdc().tail(30).reset_index(drop=True)
+            return fetch_candles(symbol, timeframe, limit=30)
         else:
             raise ValueError(f"Unsupported timeframe: {timeframe}")
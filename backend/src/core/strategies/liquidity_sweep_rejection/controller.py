@@ -1,5 +1,5 @@
 # src/core/strategies/bos_fvg_retrace/controller.py
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
 from datetime import datetime
 from src.utils.logger import get_logger
 
@@ -26,12 +26,8 @@ class LiquiditySweepRejectionController:
         self.rejection_service = RejectionService("XAUUSDc", "M15")
         self.setup_service = SetupService("XAUUSDc", "M15")
        
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(300).reset_index(drop=True)
+    def _get_recent_candles(self, symbol, timeframe, limit=300):
+        return fetch_candles(symbol, timeframe, limit=limit)
     def run(self, symbol: str, timeframe: str):
         """
         Main orchestration entry point.
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 import numpy as np
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
 
 
 class RejectionService:
@@ -203,7 +203,7 @@ class RejectionService:
         """Load recent candles."""
         if self.symbol != "XAUUSDc":
             raise ValueError(f"No candle getter for {self.symbol}")
-        df = get_data_m15_xauusdc().tail(limit).reset_index(drop=True)
+        df = fetch_candles(self.symbol, self.timeframe, limit=limit)
         df["time"] = pd.to_datetime(df["time"], unit="s", utc=True).dt.tz_convert(None)
         return df
 
@@ -2,7 +2,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
 
 class SetupService:
     """
@@ -145,7 +145,7 @@ class SetupService:
             conn.commit()
 
     def _get_recent_candles(self, limit=300):
-        df = get_data_m15_xauusdc().tail(limit).reset_index(drop=True)
+        df = fetch_candles(self.symbol, self.timeframe, limit=limit)
         df["time"] = pd.to_datetime(df["time"], unit="s", utc=True).dt.tz_convert(None)
         return df
 
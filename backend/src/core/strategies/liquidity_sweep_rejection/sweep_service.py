@@ -4,7 +4,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
 
 
 class SweepService:
@@ -191,9 +191,7 @@ class SweepService:
         if self.symbol != "XAUUSDc":
             raise ValueError(f"No data getter for {self.symbol}")
         if self.timeframe == "M15":
-            # print("get_data_m15_xauusdc")
-            # print(get_data_m15_xauusdc().tail(5).reset_index(drop=True))
-            return get_data_m15_xauusdc().tail(limit).reset_index(drop=True)
+            return fetch_candles(self.symbol, self.timeframe, limit=limit)
         else:
             raise ValueError(f"Unsupported timeframe: {self.timeframe}")
 
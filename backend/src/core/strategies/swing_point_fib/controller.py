@@ -1,6 +1,5 @@
 # src/core/strategies/swing_point_fib/controller.py
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
-from datetime import datetime
+from src.core.db.connection import get_connection
 from src.utils.logger import get_logger
 
 # (later we’ll import the others here)
@@ -10,7 +9,6 @@ from src.core.strategies.swing_point_fib.structure_service import SwingPointServ
 from src.core.strategies.swing_point_fib.major_swing_fib_service import MajorWaveFibService
 from src.core.strategies.swing_point_fib.fib_trade_setup_service import MajorWaveFibTradeSetupService
 from src.core.strategies.swing_point_fib.signal_service import MajorWaveFibSignalService
-import pandas as pd
 
 class SwingPointController:
     """
@@ -24,48 +22,41 @@ class SwingPointController:
         self.major_wave_fib_service = MajorWaveFibService()
         self.major_wave_fib_trade_setup_service = MajorWaveFibTradeSetupService()
         self.major_wave_fib_signal_service = MajorWaveFibSignalService()
+        # (symbol, timeframe) pairs whose stages are in sync → hand records over in memory
+        self._in_sync: set[tuple[str, str]] = set()
 
-        
-       
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(300).reset_index(drop=True)
     def run(self, symbol: str, timeframe: str):
         """
         Main orchestration entry point.
         To be triggered every new candle close.
+
+        Each stage hands its new records straight to the next one and everything
+        is committed in one transaction per tick. Stages poll their processed=0
+        rows only on the first tick and after a failed (rolled back) tick.
         """
         self.logger.info(f"🚀 Running Swing_Point_FIB pipeline for {symbol}-{timeframe}")
-        df = self._get_recent_candles(symbol, timeframe)
-        if df is None or len(df) < 10:
-            return
-        if "time" in df.columns:
-            df["timestamp"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-        # from src.core.mt5.get_data_helper import  get_data_m15_xauusdc_mt5
-        
-        # real_data = get_data_m15_xauusdc_mt5()
-        # real_data["time"] = pd.to_datetime(real_data["time"], utc=True)
-        # self.logger.info("from db")
-        # print(df.tail(10))
-        # self.logger.info("from realdata")
-        # print(real_data.tail(10))
-
-
+        key = (symbol, timeframe)
+        recover = key not in self._in_sync
 
         try:
-            
-            self.swing_point_service.run_step(symbol, timeframe)
-            self.major_wave_fib_service.run_step(symbol, timeframe)
-            self.major_wave_fib_trade_setup_service.run_step(symbol, timeframe)
-            self.major_wave_fib_signal_service.run_step(symbol, timeframe)
-            
-           
-           
-            
-
+            with get_connection() as conn:
+                try:
+                    swings = self.swing_point_service.run_step(symbol, timeframe, conn=conn)
+                    fib_setups = self.major_wave_fib_service.run_step(
+                        symbol, timeframe, conn=conn, new_swings=None if recover else swings)
+                    trade_setups = self.major_wave_fib_trade_setup_service.run_step(
+                        symbol, timeframe, conn=conn, fib_setups=None if recover else fib_setups)
+                    self.major_wave_fib_signal_service.run_step(
+                        symbol, timeframe, conn=conn, trade_setups=None if recover else trade_setups)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            self._in_sync.add(key)
 
         except Exception as e:
-            self.logger.exception(f"Error running BOS-FVG-Retrace pipeline: {e}")
+            # In-memory state may be ahead of the DB now → rebuild from the DB next tick
+            self._in_sync.discard(key)
+            self.swing_point_service.forget(symbol, timeframe)
+            self.major_wave_fib_service.forget(symbol, timeframe)
+            self.logger.exception(f"Error running Swing_Point_FIB pipeline: {e}")
@@ -0,0 +1,186 @@
+# src/core/strategies/swing_point_fib/fib_backtest_kernel.py
+"""
+NumPy first-touch trade simulation on columnar candles (time/high/low arrays).
+
+Same rules as the old candle-by-candle FibBacktestService._simulate_trade:
+- candles start at the first one with time >= discovered_at
+- entry = first candle whose [low, high] contains the entry price, as long as
+  its time <= first candle time + max_wait; otherwise the setup expires
+- from the entry candle on (inclusive), the first SL / TP touch closes the trade;
+  when both happen on the same candle, BUY takes the SL and SELL takes the TP
+- entered but never closed → timeout
+
+sweep() evaluates a whole parameter grid in one call, reusing each setup's
+start and entry indices across the combinations that share them.
+"""
+import itertools
+import numpy as np
+
+NO_DATA = -2
+EXPIRED = -1
+
+EXIT_NONE, EXIT_SL, EXIT_TP = 0, 1, 2
+EXIT_REASONS = {EXIT_NONE: "timeout", EXIT_SL: "sl", EXIT_TP: "tp"}
+
+_FIRST_BLOCK = 256
+
+
+def start_indices(times: np.ndarray, discovered: np.ndarray) -> np.ndarray:
+    """Index of the first candle with time >= discovered (epoch seconds), per setup."""
+    return np.searchsorted(times, np.asarray(discovered, dtype=np.int64), side="left")
+
+
+def find_entries(times, highs, lows, starts, entries, max_wait_sec) -> np.ndarray:
+    """
+    Entry candle index per setup, or EXPIRED / NO_DATA.
+    Only the max_wait window after each setup's first candle is scanned.
+    """
+    n = len(times)
+    starts = np.asarray(starts, dtype=np.int64)
+    entries = np.asarray(entries, dtype=np.float64)
+    result = np.full(len(starts), NO_DATA, dtype=np.int64)
+
+    has_data = starts < n
+    first_times = times[np.minimum(starts, n - 1)] if n else np.zeros(len(starts), dtype=np.int64)
+    ends = np.searchsorted(times, first_times + int(max_wait_sec), side="right")
+
+    for i in np.flatnonzero(has_data):
+        s, e, price = starts[i], ends[i], entries[i]
+        touched = (lows[s:e] <= price) & (highs[s:e] >= price)
+        k = int(touched.argmax())
+        result[i] = s + k if touched[k] else EXPIRED
+    return result
+
+
+def first_at_or_below(values: np.ndarray, start: int, level: float) -> int:
+    """First index >= start with values[index] <= level, or -1. Scans in doubling blocks."""
+    return _first_touch(values, start, level, below=True)
+
+
+def first_at_or_above(values: np.ndarray, start: int, level: float) -> int:
+    """First index >= start with values[index] >= level, or -1. Scans in doubling blocks."""
+    return _first_touch(values, start, level, below=False)
+
+
+def _first_touch(values, start, level, below):
+    n = len(values)
+    block = _FIRST_BLOCK
+    while start < n:
+        chunk = values[start:start + block]
+        hits = chunk <= level if below else chunk >= level
+        k = int(hits.argmax())
+        if hits[k]:
+            return start + k
+        start += len(chunk)
+        block *= 2
+    return -1
+
+
+def find_exits(highs, lows, entry_idx, sls, tps, bullish):
+    """
+    (exit_idx, exit_code) per setup; exit_idx = -1 when not entered or never closed.
+    exit_code is EXIT_SL / EXIT_TP / EXIT_NONE (timeout or not entered).
+    """
+    count = len(entry_idx)
+    exit_idx = np.full(count, -1, dtype=np.int64)
+    exit_code = np.full(count, EXIT_NONE, dtype=np.int8)
+
+    for i in np.flatnonzero(np.asarray(entry_idx) >= 0):
+        j = int(entry_idx[i])
+        if bullish[i]:
+            sl_at = first_at_or_below(lows, j, sls[i])
+            tp_at = first_at_or_above(highs, j, tps[i])
+            sl_first = sl_at >= 0 and (tp_at < 0 or sl_at <= tp_at)   # SL wins ties
+        else:
+            tp_at = first_at_or_below(lows, j, tps[i])
+            sl_at = first_at_or_above(highs, j, sls[i])
+            sl_first = sl_at >= 0 and (tp_at < 0 or sl_at < tp_at)    # TP wins ties
+
+        if sl_first:
+            exit_idx[i], exit_code[i] = sl_at, EXIT_SL
+        elif tp_at >= 0:
+            exit_idx[i], exit_code[i] = tp_at, EXIT_TP
+    return exit_idx, exit_code
+
+
+def simulate(times, highs, lows, discovered, entries, sls, tps, bullish, max_wait_sec):
+    """Full simulation: (entry_idx, exit_idx, exit_code) per setup."""
+    starts = start_indices(times, discovered)
+    entry_idx = find_entries(times, highs, lows, starts, entries, max_wait_sec)
+    exit_idx, exit_code = find_exits(highs, lows, entry_idx, sls, tps, bullish)
+    return entry_idx, exit_idx, exit_code
+
+
+# ===================================================
+# Parameter sweep
+# ===================================================
+def trade_levels(fib_low, fib_high, bullish, entry_ratio, sl_offset, tp_rule):
+    """
+    Vectorized (entries, sls, tps) for one grid point.
+    entry = entry_ratio retracement of the fib range, SL = fib extreme ± sl_offset,
+    tp_rule = ("fib", None) → opposite fib extreme, ("rr", k) → k × risk, ("points", k) → k price points.
+    """
+    fib_range = fib_high - fib_low
+    entries = np.where(bullish, fib_high - fib_range * entry_ratio, fib_low + fib_range * entry_ratio)
+    sls = np.where(bullish, fib_low - sl_offset, fib_high + sl_offset)
+    direction = np.where(bullish, 1.0, -1.0)
+
+    kind, value = tp_rule
+    if kind == "fib":
+        tps = np.where(bullish, fib_high, fib_low)
+    elif kind == "rr":
+        tps = entries + direction * np.abs(entries - sls) * value
+    elif kind == "points":
+        tps = entries + direction * value
+    else:
+        raise ValueError(f"Unknown TP rule: {tp_rule}")
+    return entries, sls, tps
+
+
+def sweep(times, highs, lows, discovered, fib_low, fib_high, bullish,
+          entry_ratios, sl_offsets, tp_rules, max_waits_sec):
+    """
+    Simulate every combination of itertools.product(entry_ratios, sl_offsets, tp_rules, max_waits_sec).
+    Returns (exit_code, result_r), both shaped (setups, combinations):
+    exit_code is EXPIRED / EXIT_NONE (timeout) / EXIT_SL / EXIT_TP (NO_DATA setups → EXPIRED, r=0),
+    result_r the R multiple of the exit (0 when not closed).
+
+    Entries are searched once per entry ratio with the longest wait; shorter
+    waits only cut off entries later than their deadline. Exits depend on
+    (ratio, SL offset, TP rule) only, so they are shared by all waits.
+    """
+    discovered = np.asarray(discovered, dtype=np.int64)
+    bullish = np.asarray(bullish, dtype=bool)
+    fib_low = np.asarray(fib_low, dtype=np.float64)
+    fib_high = np.asarray(fib_high, dtype=np.float64)
+    count, n = len(discovered), len(times)
+    combos = list(itertools.product(entry_ratios, sl_offsets, tp_rules, max_waits_sec))
+    exit_code = np.full((count, len(combos)), EXPIRED, dtype=np.int8)
+    result_r = np.zeros((count, len(combos)), dtype=np.float64)
+
+    starts = start_indices(times, discovered)
+    first_times = times[np.minimum(starts, n - 1)] if n else np.zeros(count, dtype=np.int64)
+    longest_wait = max(max_waits_sec)
+    column = {combo: i for i, combo in enumerate(combos)}
+
+    for ratio in entry_ratios:
+        entries, _, _ = trade_levels(fib_low, fib_high, bullish, ratio, 0.0, ("fib", None))
+        entry_idx = find_entries(times, highs, lows, starts, entries, longest_wait)
+        entered = entry_idx >= 0
+        entry_times = np.where(entered, times[np.maximum(entry_idx, 0)], 0) if n else np.zeros(count, dtype=np.int64)
+
+        for offset, rule in itertools.product(sl_offsets, tp_rules):
+            entries, sls, tps = trade_levels(fib_low, fib_high, bullish, ratio, offset, rule)
+            exit_idx, codes = find_exits(highs, lows, entry_idx, sls, tps, bullish)
+            exit_prices = np.where(codes == EXIT_SL, sls, tps)
+            risk = np.abs(entries - sls)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = np.where(bullish, exit_prices - entries, entries - exit_prices) / risk
+            r = np.where((exit_idx >= 0) & (risk != 0), r, 0.0)
+
+            for wait in max_waits_sec:
+                in_time = entered & (entry_times <= first_times + wait)
+                i = column[(ratio, offset, rule, wait)]
+                exit_code[:, i] = np.where(in_time, codes, EXPIRED)
+                result_r[:, i] = np.where(in_time, r, 0.0)
+    return exit_code, result_r
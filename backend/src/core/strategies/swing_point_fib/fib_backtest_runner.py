@@ -0,0 +1,81 @@
+# src/core/strategies/swing_point_fib/fib_backtest_runner.py
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from src.utils.logger import get_logger
+
+logger = get_logger("FibBacktestRunner")
+
+# 1 / unset → in-process (deterministic, the default); N > 1 → N worker processes; 0 → one per CPU.
+# Parallel runs need the calling script's entry code under `if __name__ == "__main__":` —
+# on Windows (spawn) every worker re-imports the main module.
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "1")) or os.cpu_count() or 1
+
+SHARED_COLUMNS = ("time", "high", "low")
+
+# Below this many setups the pool start-up costs more than it saves
+MIN_PARALLEL_SETUPS = 500
+
+# Worker-side memory-mapped candle columns, opened once per process by _attach
+_shared: dict[str, np.ndarray] = {}
+
+
+class BacktestRunner:
+    """
+    Runs a backtest kernel over setups, sharded across a ProcessPoolExecutor.
+
+    Candle columns (time/high/low) are written once to .npy files in a temp
+    folder and memory-mapped read-only by every worker, so the history is
+    shared through the page cache instead of being pickled per task.
+    Setups are split into contiguous shards; per-setup outputs are concatenated
+    in shard order, so results are identical to a single in-process call.
+
+    func(times, highs, lows, **per_setup, **params) must be a module-level
+    function returning a tuple of per-setup arrays (e.g. fib_backtest_kernel.simulate).
+    """
+
+    def __init__(self, workers: int = None, shards_per_worker: int = 4):
+        self.workers = max(1, workers if workers is not None else BACKTEST_WORKERS)
+        self.shards_per_worker = shards_per_worker
+
+    def map(self, candles, func, per_setup: dict, **params):
+        count = len(next(iter(per_setup.values()))) if per_setup else 0
+        if self.workers == 1 or count < MIN_PARALLEL_SETUPS:
+            return func(candles.time, candles.high, candles.low, **per_setup, **params)
+
+        shard_count = min(count, self.workers * self.shards_per_worker)
+        bounds = np.linspace(0, count, shard_count + 1).astype(np.int64)
+
+        with tempfile.TemporaryDirectory(prefix="fib_backtest_") as folder:
+            paths = self._share(candles, Path(folder))
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_attach, initargs=(paths,)) as pool:
+                futures = [
+                    pool.submit(_run_shard, func, {name: values[a:b] for name, values in per_setup.items()}, params)
+                    for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+                ]
+                parts = [future.result() for future in futures]
+
+        logger.info(f"⚙️ Backtested {count} setups in {len(parts)} shards on {self.workers} workers")
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    @staticmethod
+    def _share(candles, folder: Path) -> dict[str, str]:
+        paths = {}
+        for name in SHARED_COLUMNS:
+            path = folder / f"{name}.npy"
+            np.save(path, np.ascontiguousarray(getattr(candles, name)))
+            paths[name] = str(path)
+        return paths
+
+
+def _attach(paths: dict[str, str]):
+    """Pool initializer: memory-map the shared candle columns (read-only, zero-copy)."""
+    _shared.clear()
+    for name, path in paths.items():
+        _shared[name] = np.load(path, mmap_mode="r")
+
+
+def _run_shard(func, per_setup, params):
+    return func(_shared["time"], _shared["high"], _shared["low"], **per_setup, **params)
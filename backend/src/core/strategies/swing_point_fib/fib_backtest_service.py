@@ -1,13 +1,40 @@
+import calendar
+import itertools
+import numpy as np
 import pandas as pd
+from contextlib import nullcontext
 from datetime import datetime
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.candle_store import CandleStore
+from src.core.strategies.swing_point_fib import fib_backtest_kernel as kernel
+from src.core.strategies.swing_point_fib.fib_backtest_runner import BacktestRunner
+from src.core.strategies.swing_point_fib.fib_backtest_writer import BacktestResultWriter
+
+
+# Default sweep grid. TP rules: "fib" = opposite fib extreme (the stored setup TP,
+# 1:1.6 at a 0.618 entry), "rr<k>" = k × risk, "pts<k>" = k price points.
+DEFAULT_SWEEP_GRID = {
+    "tp_rule": ("fib", "rr1", "pts7"),
+    "entry_ratio": (0.5, 0.618, 0.705, 0.786),
+    "sl_offset": (0.0, 1.0, 2.0),
+    "max_wait_min": (600, 1800, 2880),
+}
+
+
+RESULT_COLUMNS = (
+    "setup_id", "symbol", "timeframe", "direction",
+    "entry_time", "exit_time",
+    "entry_price", "stop_loss", "take_profit", "exit_price",
+    "result_pips", "result_r", "exit_reason", "duration_min", "created_at",
+)
 
 
 class FibBacktestService:
-    def __init__(self):
+    def __init__(self, workers=None):
+        """workers: backtest processes (default BACKTEST_WORKERS); 1 runs in-process."""
         self.logger = get_logger("FibBacktestService")
+        self.runner = BacktestRunner(workers)
 
   
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -15,89 +42,231 @@ class FibBacktestService:
     # ===================================================
     # Entrypoint
     # ===================================================
-    def run_all(self, save_to_db=False, export_excel=True, excel_path=f"backtest_results_{cleantimestamp}.xlsx"):
+    def run_all(self, save_to_db=False, output_path=f"backtest_results_{cleantimestamp}.csv",
+                export_excel=False, excel_path=f"backtest_summary_{cleantimestamp}.xlsx", chunk_size=5000):
+        """
+        Backtest all setups and stream the results in chunks of `chunk_size`:
+        to `output_path` (.csv, or .parquet with pyarrow; None to skip) and,
+        with save_to_db, to strategy_swing_point_fib_backtest_result (one commit at the end).
+        Returns the summary per direction; export_excel writes that summary to `excel_path`.
+        """
         setups = self._get_all_setups()
         if setups.empty:
             self.logger.warning("No setups found in DB.")
             return
 
-        results = []
         total = len(setups)
         self.logger.info(f"Starting backtest for {total} setups...")
 
-        for idx, setup in setups.iterrows():
-            try:
-                result = self._backtest_setup(setup)
-                results.append(result)
-                self.logger.info(
-                    f"[{idx+1}/{total}] Setup {setup['id']} ({result['direction']}) → {result['exit_reason']} | {result['result_r']}R"
-                )
-            except Exception as e:
-                self.logger.exception(f"Error testing setup id={setup['id']}: {e}")
-
-        df_results = pd.DataFrame(results)
+        tallies = []
+        writer = BacktestResultWriter(output_path) if output_path else None
+        with get_connection() if save_to_db else nullcontext() as conn, writer or nullcontext():
+            for chunk in self._iter_results(setups, chunk_size):
+                df_chunk = pd.DataFrame(chunk)
+                if writer:
+                    writer.write(df_chunk)
+                if save_to_db:
+                    self._save_results_to_db(conn, chunk)
+                tallies.append(self._tally(df_chunk))
+            if save_to_db:
+                conn.commit()
+                self.logger.info("🗄️ Results saved to database.")
+
+        if writer:
+            self.logger.info(f"📄 {writer.rows} backtest results written to {output_path}")
+
+        summary = self._summarize_results(tallies)
+        if not summary.empty:
+            self.logger.info(f"Backtest summary ({total} setups):\n{summary.to_string(index=False)}")
 
         if export_excel:
-            df_results.to_excel(excel_path, index=False)
-            self.logger.info(f"📊 Backtest results saved to {excel_path}")
-
-        if save_to_db:
-            self._save_results_to_db(df_results)
-            self.logger.info("🗄️ Results saved to database.")
+            summary.to_excel(excel_path, index=False)
+            self.logger.info(f"📊 Backtest summary saved to {excel_path}")
 
         self.logger.info("✅ Backtest completed successfully.")
+        return summary
+
+    def sweep(self, grid=None, top=20, excel_path=None):
+        """
+        Backtest every combination of the grid (see DEFAULT_SWEEP_GRID; missing keys use
+        the defaults) in one pass over the shared candles. Entries come from the setups'
+        fib_low/fib_high, so entry_ratio / sl_offset are not limited to the stored prices.
+        Returns a summary DataFrame ranked by total R, best first (also saved to `excel_path` if given).
+        """
+        grid = {key: tuple(dict.fromkeys(values)) for key, values in {**DEFAULT_SWEEP_GRID, **(grid or {})}.items()}
+        setups = self._get_all_setups()
+        if setups.empty:
+            self.logger.warning("No setups found in DB.")
+            return pd.DataFrame()
+
+        combos = list(itertools.product(grid["entry_ratio"], grid["sl_offset"], grid["tp_rule"], grid["max_wait_min"]))
+        self.logger.info(f"Sweeping {len(combos)} combinations over {len(setups)} setups...")
+
+        exit_codes, result_r = [], []
+        for (symbol, timeframe), group in setups.groupby(["symbol", "timeframe"], sort=False):
+            candles = self._get_candle_arrays(symbol, timeframe)
+            per_setup = dict(
+                discovered=np.array([calendar.timegm(pd.Timestamp(t).utctimetuple()) for t in group["last_swing_discovered_at"]], dtype=np.int64),
+                fib_low=group["fib_low"].astype(float).to_numpy(),
+                fib_high=group["fib_high"].astype(float).to_numpy(),
+                bullish=(group["trend"] == "bullish").to_numpy(),
+            )
+            codes, r = self.runner.map(
+                candles, kernel.sweep, per_setup,
+                entry_ratios=tuple(float(v) for v in grid["entry_ratio"]),
+                sl_offsets=tuple(float(v) for v in grid["sl_offset"]),
+                tp_rules=tuple(self._parse_tp_rule(rule) for rule in grid["tp_rule"]),
+                max_waits_sec=tuple(int(m) * 60 for m in grid["max_wait_min"]),
+            )
+            exit_codes.append(codes)
+            result_r.append(r)
+
+        summary = self._summarize_sweep(combos, np.concatenate(exit_codes), np.concatenate(result_r))
+        self.logger.info(f"🏁 Sweep done. Top {min(top, len(summary))}:\n{summary.head(top).to_string(index=False)}")
+        if excel_path:
+            summary.to_excel(excel_path, index=False)
+            self.logger.info(f"📊 Sweep summary saved to {excel_path}")
+        return summary
+
+    @staticmethod
+    def _parse_tp_rule(rule):
+        """'fib' → ("fib", None), 'rr1.6' → ("rr", 1.6), 'pts7' → ("points", 7.0)."""
+        if rule == "fib":
+            return "fib", None
+        for prefix, kind in (("rr", "rr"), ("pts", "points")):
+            if rule.startswith(prefix):
+                return kind, float(rule[len(prefix):])
+        raise ValueError(f"Unknown TP rule: {rule}")
+
+    @staticmethod
+    def _summarize_sweep(combos, exit_codes, result_r):
+        """One row per combination: counts, win rate, total / average R, max drawdown (R, setup order)."""
+        closed = (exit_codes == kernel.EXIT_SL) | (exit_codes == kernel.EXIT_TP)
+        wins = exit_codes == kernel.EXIT_TP
+        equity = result_r.cumsum(axis=0)
+        drawdown = (np.maximum.accumulate(np.vstack([np.zeros((1, len(combos))), equity]), axis=0)[1:] - equity).max(axis=0, initial=0)
+        gains = np.where(result_r > 0, result_r, 0).sum(axis=0)
+        losses = -np.where(result_r < 0, result_r, 0).sum(axis=0)
+
+        summary = pd.DataFrame({
+            "tp_rule": [c[2] for c in combos],
+            "entry_ratio": [c[0] for c in combos],
+            "sl_offset": [c[1] for c in combos],
+            "max_wait_min": [c[3] for c in combos],
+            "trades": (exit_codes >= kernel.EXIT_NONE).sum(axis=0),
+            "tp": wins.sum(axis=0),
+            "sl": (exit_codes == kernel.EXIT_SL).sum(axis=0),
+            "timeout": (exit_codes == kernel.EXIT_NONE).sum(axis=0),
+            "expired": (exit_codes == kernel.EXPIRED).sum(axis=0),
+            "win_rate": np.round(wins.sum(axis=0) / np.maximum(closed.sum(axis=0), 1), 3),
+            "total_r": np.round(result_r.sum(axis=0), 2),
+            "avg_r": np.round(result_r.sum(axis=0) / np.maximum(closed.sum(axis=0), 1), 3),
+            "profit_factor": np.round(np.where(losses > 0, gains / np.where(losses > 0, losses, 1), np.inf), 2),
+            "max_drawdown_r": np.round(drawdown, 2),
+        })
+        return summary.sort_values(["total_r", "win_rate"], ascending=False, kind="stable").reset_index(drop=True)
 
     # ===================================================
     # Core logic
     # ===================================================
-    def _backtest_setup(self, setup):
-        symbol = setup["symbol"]
-        timeframe = setup["timeframe"]
-        discovered_at = setup["last_swing_discovered_at"]
+    def _backtest_setups(self, setups: pd.DataFrame, max_wait_min=1800):
+        """All results as one list (see _iter_results)."""
+        return [result for chunk in self._iter_results(setups, max_wait_min=max_wait_min) for result in chunk]
+
+    def _iter_results(self, setups: pd.DataFrame, chunk_size=5000, max_wait_min=1800):
+        """
+        Backtest all setups with the NumPy kernel: candles are loaded once per
+        symbol/timeframe, entries and first SL/TP touches are found per setup
+        with searchsorted + vectorized scans, sharded over worker processes
+        by BacktestRunner. Yields result dicts in chunks, in the setups' order;
+        only the kernel's index arrays are held for the whole run.
+        """
+        count = len(setups)
+        entry_idx = np.empty(count, dtype=np.int64)
+        exit_idx = np.empty(count, dtype=np.int64)
+        exit_code = np.empty(count, dtype=np.int8)
+        levels = np.empty((count, 3), dtype=np.float64)
+        candle_times = {}
+
+        for (symbol, timeframe), rows in setups.groupby(["symbol", "timeframe"], sort=False).indices.items():
+            group = setups.iloc[rows]
+            candles = self._get_candle_arrays(symbol, timeframe)
+            candle_times[(symbol, timeframe)] = candles.time
+            levels[rows] = [self._trade_levels(setup) for _, setup in group.iterrows()]
+            discovered = [calendar.timegm(pd.Timestamp(t).utctimetuple()) for t in group["last_swing_discovered_at"]]
+
+            entry_idx[rows], exit_idx[rows], exit_code[rows] = self.runner.map(
+                candles, kernel.simulate,
+                dict(discovered=np.asarray(discovered, dtype=np.int64), entries=levels[rows, 0],
+                     sls=levels[rows, 1], tps=levels[rows, 2], bullish=(group["trend"] == "bullish").to_numpy()),
+                max_wait_sec=max_wait_min * 60,
+            )
+
+        for start in range(0, count, chunk_size):
+            chunk = []
+            for i, (_, setup) in enumerate(setups.iloc[start:start + chunk_size].iterrows(), start):
+                if entry_idx[i] == kernel.NO_DATA:
+                    self.logger.warning(f"No candles after setup id={setup['id']}, skipped.")
+                    continue
+                times = candle_times[(setup["symbol"], setup["timeframe"])]
+                result = self._build_result(setup, times, tuple(levels[i]), entry_idx[i], exit_idx[i], exit_code[i])
+                chunk.append(result)
+                self.logger.debug(
+                    f"Setup {setup['id']} ({result['direction']}) → {result['exit_reason']} | {result['result_r']}R"
+                )
+            if chunk:
+                yield chunk
+
+    def _trade_levels(self, setup):
+        """(entry, sl, tp) for a setup — the TP rule in use is the fixed 7-point one."""
         # 1:1.6
         # entry = float(setup["entry_price"])
         # sl = float(setup["sl_price"])
         # tp = float(setup["tp_price"])
-        # trend = setup["trend"]
-
 
         # 1:1
         # entry = float(setup["entry_price"])
         # sl = float(setup["sl_price"])
-        
-        # trend = setup["trend"]
-        # if trend == "bearish":
+        # if setup["trend"] == "bearish":
         #     tp = entry -abs(entry - sl)
         # else:
         #     tp = entry + abs(entry - sl)
 
-
-
         # 1:5point
         entry = float(setup["entry_price"])
         sl = float(setup["sl_price"])
-        
-        trend = setup["trend"]
-        if trend == "bearish":
+        if setup["trend"] == "bearish":
             tp = entry -7
         else:
             tp = entry + 7
+        return entry, sl, tp
+
+    def _build_result(self, setup, times, levels, entry_idx, exit_idx, exit_code):
+        symbol = setup["symbol"]
+        trend = setup["trend"]
+        entry, sl, tp = (float(level) for level in levels)
         # Determine direction
         direction = "buy" if trend == "bullish" else "sell"
 
-        df = self._get_candles(symbol, timeframe)
-        df = df[df["timestamp"] >= discovered_at].reset_index(drop=True)
-
-        entry_time, exit_time, exit_price, exit_reason = self._simulate_trade(df, entry, sl, tp, trend)
+        if entry_idx < 0:
+            entry_time, exit_time, exit_price, exit_reason = None, None, None, "expired"
+        else:
+            entry_time = pd.Timestamp(int(times[entry_idx]), unit="s").to_pydatetime()
+            exit_reason = kernel.EXIT_REASONS[int(exit_code)]
+            if exit_idx < 0:
+                exit_time, exit_price = None, None
+            else:
+                exit_time = pd.Timestamp(int(times[exit_idx]), unit="s").to_pydatetime()
+                exit_price = sl if exit_code == kernel.EXIT_SL else tp
 
         result_pips, result_r, duration_min = self._calculate_metrics(
             symbol, entry, sl, tp, entry_time, exit_time, exit_price, trend
         )
 
         return {
-            "setup_id": setup["id"],
+            "setup_id": int(setup["id"]),
             "symbol": symbol,
-            "timeframe": timeframe,
+            "timeframe": setup["timeframe"],
             "direction": direction,
             "entry_time": entry_time,
             "exit_time": exit_time,
@@ -112,59 +281,6 @@ class FibBacktestService:
             "created_at": datetime.utcnow(),
         }
 
-    # ===================================================
-    # Trade simulation logic
-    # ===================================================
-    def _simulate_trade(self, df, entry, sl, tp, trend, max_wait_min=1800):
-        """
-        Simulate trade behavior for a fib setup.
-
-        - Waits for entry until max_wait_min passed since setup start
-        - Once entered, monitors candle-by-candle for TP or SL
-        - If price never hits entry → result = 'expired'
-        - If entered but never hits TP/SL → result = 'timeout'
-        """
-
-        entered = False
-        entry_time = None
-        first_candle_time = df["timestamp"].iloc[0]
-        expire_after = first_candle_time + pd.Timedelta(minutes=max_wait_min)
-
-        for _, row in df.iterrows():
-            high, low, ts = row["high"], row["low"], row["timestamp"]
-
-            # Stop waiting for entry if too long
-            if not entered and ts > expire_after:
-                return None, None, None, "expired"
-
-            # Wait for entry trigger
-            if not entered:
-                if low <= entry <= high:
-                    entered = True
-                    entry_time = ts
-                else:
-                    continue
-
-            # After entry, check TP/SL sequence
-            if trend == "bullish":
-                # BUY: first stop-loss, then take-profit
-                if low <= sl:
-                    return entry_time, ts, sl, "sl"
-                if high >= tp:
-                    return entry_time, ts, tp, "tp"
-            else:  # bearish
-                # SELL: first take-profit, then stop-loss
-                if low <= tp:
-                    return entry_time, ts, tp, "tp"
-                if high >= sl:
-                    return entry_time, ts, sl, "sl"
-
-        # Never triggered TP/SL
-        if not entered:
-            return None, None, None, "expired"
-        else:
-            return entry_time, None, None, "timeout"
-
     # ===================================================
     # Metrics calculation logic
     # ===================================================
@@ -190,19 +306,12 @@ class FibBacktestService:
     # ===================================================
     # Candle data retrieval
     # ===================================================
-    def _get_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No candle data function for {symbol}-{timeframe}")
-
-        if "timestamp" not in df.columns:
-            if "time" in df.columns:
-                df["timestamp"] = pd.to_datetime(df["time"], unit="s")
-            else:
-                raise ValueError("No timestamp or time column in candle data")
-
-        return df.sort_values("timestamp").reset_index(drop=True)
+    def _get_candle_arrays(self, symbol, timeframe):
+        """Columnar candles from the shared CandleStore (ascending time, loaded once per run)."""
+        candles = CandleStore.get_instance().get_candles(symbol, timeframe)
+        if candles.is_empty:
+            raise ValueError(f"No candle data for {symbol}-{timeframe}")
+        return candles
 
     # ===================================================
     # Get all setups from DB
@@ -212,7 +321,7 @@ class FibBacktestService:
             query = """
                 SELECT id, symbol, timeframe, trend,
                        entry_price, sl_price, tp_price,
-                       last_swing_discovered_at
+                       fib_low, fib_high, last_swing_discovered_at
                 FROM strategy_swing_point_fib_trade_setup
                 WHERE symbol='XAUUSDc' AND timeframe='M15'
                 ORDER BY last_swing_discovered_at ASC
@@ -223,27 +332,59 @@ class FibBacktestService:
     # ===================================================
     # DB Writer
     # ===================================================
-    def _save_results_to_db(self, df):
-        if df.empty:
+    def _save_results_to_db(self, conn, results, rows_per_statement=1000):
+        """Insert a chunk of result dicts with multi-row INSERTs on `conn` (caller commits)."""
+        if not results:
             return
 
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            for _, row in df.iterrows():
-                cursor.execute(
-                    """
+        rows = [tuple(result[column] for column in RESULT_COLUMNS) for result in results]
+        cursor = conn.cursor()
+        try:
+            for i in range(0, len(rows), rows_per_statement):
+                batch = rows[i:i + rows_per_statement]
+                cursor.execute(f"""
                     INSERT INTO strategy_swing_point_fib_backtest_result
-                    (setup_id, symbol, timeframe, direction,
-                     entry_time, exit_time,
-                     entry_price, stop_loss, take_profit, exit_price,
-                     result_pips, result_r, exit_reason, duration_min, created_at)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                    """,
-                    (
-                        row["setup_id"], row["symbol"], row["timeframe"], row["direction"],
-                        row["entry_time"], row["exit_time"],
-                        row["entry_price"], row["stop_loss"], row["take_profit"], row["exit_price"],
-                        row["result_pips"], row["result_r"], row["exit_reason"], row["duration_min"], row["created_at"]
-                    ),
-                )
-            conn.commit()
+                    ({", ".join(RESULT_COLUMNS)})
+                    VALUES {", ".join(["(" + ",".join(["%s"] * len(RESULT_COLUMNS)) + ")"] * len(batch))}
+                """, [value for row in batch for value in row])
+        finally:
+            cursor.close()
+
+    # ===================================================
+    # Summary
+    # ===================================================
+    @staticmethod
+    def _tally(df):
+        """Per (direction, exit_reason): count and summed R of one result chunk."""
+        if df.empty:
+            return pd.DataFrame(columns=["direction", "exit_reason", "count", "total_r"])
+        return df.groupby(["direction", "exit_reason"]).agg(
+            count=("setup_id", "size"), total_r=("result_r", "sum")
+        ).reset_index()
+
+    @staticmethod
+    def _summarize_results(tallies):
+        """Combine chunk tallies into one row per direction plus an 'all' row."""
+        tallies = [t for t in tallies if not t.empty]
+        if not tallies:
+            return pd.DataFrame()
+
+        combined = pd.concat(tallies).groupby(["direction", "exit_reason"])[["count", "total_r"]].sum()
+        counts = combined["count"].unstack(fill_value=0).reindex(columns=["tp", "sl", "timeout", "expired"], fill_value=0)
+        counts.loc["all"] = counts.sum()
+        total_r = combined["total_r"].groupby(level="direction").sum()
+        total_r.loc["all"] = total_r.sum()
+
+        closed = counts["tp"] + counts["sl"]
+        summary = pd.DataFrame({
+            "setups": counts.sum(axis=1),
+            "trades": counts["tp"] + counts["sl"] + counts["timeout"],
+            "tp": counts["tp"],
+            "sl": counts["sl"],
+            "timeout": counts["timeout"],
+            "expired": counts["expired"],
+            "win_rate": (counts["tp"] / closed.where(closed > 0, 1)).round(3),
+            "total_r": total_r.reindex(counts.index).round(2),
+            "avg_r": (total_r.reindex(counts.index) / closed.where(closed > 0, 1)).round(3),
+        })
+        return summary.rename_axis("direction").reset_index()
@@ -0,0 +1,48 @@
+# src/core/strategies/swing_point_fib/fib_backtest_writer.py
+import pandas as pd
+from pathlib import Path
+
+
+class BacktestResultWriter:
+    """
+    Appends backtest result chunks to a columnar file as they are produced.
+    .csv → header written with the first chunk, then appended;
+    .parquet → one row group per chunk (needs pyarrow, which is optional).
+    Use as a context manager so the Parquet footer gets written.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.rows = 0
+        self._parquet = self.path.suffix.lower() == ".parquet"
+        self._writer = None
+        if self._parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError("Parquet output needs pyarrow (pip install pyarrow), or use a .csv path") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
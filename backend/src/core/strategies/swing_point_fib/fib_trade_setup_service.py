@@ -8,6 +8,8 @@ class MajorWaveFibTradeSetupService:
     Fibonacci Trade Setup Service
     - Uses fib setups from major wave service
     - Creates trade setups (entry, sl, tp) based on fixed retracement levels
+    - Fib setups can be handed over in memory by MajorWaveFibService;
+      unprocessed rows are polled from the DB only when none are handed over
     """
 
     def __init__(self):
@@ -16,41 +18,57 @@ class MajorWaveFibTradeSetupService:
     # ===================================================
     # Public Entrypoint
     # ===================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, conn=None, fib_setups=None):
+        """
+        Create trade setups for new fib setups. Returns the created trade setup rows.
+        fib_setups: handed over by MajorWaveFibService; None → poll processed=0 rows (recovery).
+        With `conn`, writes join the caller's transaction (no commit) and errors propagate.
+        """
+        if conn is not None:
+            return self._process(symbol, timeframe, conn, fib_setups)
         try:
-            setups = self._get_unprocessed_fib_setups(symbol, timeframe)
-            if not setups:
-                self.logger.info(f"No new Fibonacci setups to process for {symbol}-{timeframe}")
-                return
+            with get_connection() as own_conn:
+                trade_setups = self._process(symbol, timeframe, own_conn, fib_setups)
+                own_conn.commit()
+                return trade_setups
+        except Exception as e:
+            self.logger.exception(f"Error in FibTradeSetupService.run_step: {e}")
+            return []
 
-            for setup in setups:
-                entry, sl, tp = self._calculate_levels(setup)
-                if not entry or not sl or not tp:
-                    self.logger.warning(f"Invalid fib values for setup {setup['id']}, skipping.")
-                    self._mark_fib_processed(setup["id"])
-                    continue
+    def _process(self, symbol, timeframe, conn, fib_setups):
+        setups = self._get_unprocessed_fib_setups(conn, symbol, timeframe) if fib_setups is None else fib_setups
+        if not setups:
+            self.logger.info(f"No new Fibonacci setups to process for {symbol}-{timeframe}")
+            return []
 
-                self._save_trade_setup(symbol, timeframe, setup, entry, sl, tp, setup['last_swing_discovered_at'])
-                self._mark_fib_processed(setup["id"])
+        rows = []
+        for setup in setups:
+            entry, sl, tp = self._calculate_levels(setup)
+            if not entry or not sl or not tp:
+                self.logger.warning(f"Invalid fib values for setup {setup['id']}, skipping.")
+                continue
+            rows.append((
+                symbol, timeframe, setup["id"], setup["trend"], entry, sl, tp,
+                setup["fib_low"], setup["fib_high"], setup["last_swing_discovered_at"], datetime.utcnow(),
+            ))
 
-        except Exception as e:
-            self.logger.exception(f"Error in FibTradeSetupService.run_step: {e}")
+        return self._save_batch(conn, symbol, timeframe, rows, [setup["id"] for setup in setups])
 
     # ===================================================
     # Helpers
     # ===================================================
-    def _get_unprocessed_fib_setups(self, symbol, timeframe):
-        with get_connection() as conn:
-            cur = conn.cursor(dictionary=True)
-            cur.execute("""
-                SELECT id, trend, fib_low, fib_high, last_swing_candle_time, last_swing_discovered_at
-                FROM strategy_swing_point_fib_setup_major_wave
-                WHERE symbol=%s AND timeframe=%s
-                  AND processed=0
-                ORDER BY last_swing_discovered_at ASC
-            """, (symbol, timeframe))
-            setups = cur.fetchall()
-            return setups
+    def _get_unprocessed_fib_setups(self, conn, symbol, timeframe):
+        cur = conn.cursor(dictionary=True)
+        cur.execute("""
+            SELECT id, trend, fib_low, fib_high, last_swing_candle_time, last_swing_discovered_at
+            FROM strategy_swing_point_fib_setup_major_wave
+            WHERE symbol=%s AND timeframe=%s
+              AND processed=0
+            ORDER BY last_swing_discovered_at ASC
+        """, (symbol, timeframe))
+        setups = cur.fetchall()
+        cur.close()
+        return setups
 
     def _calculate_levels(self, setup):
         """
@@ -81,37 +99,44 @@ class MajorWaveFibTradeSetupService:
 
         return entry, sl, tp
 
-    def _save_trade_setup(self, symbol, timeframe, fib_setup, entry, sl, tp, last_swing_discovered_at):
-        with get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO strategy_swing_point_fib_trade_setup
-                (symbol, timeframe, fib_setup_id, trend, entry_price, sl_price, tp_price, fib_low, fib_high, last_swing_discovered_at, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                symbol,
-                timeframe,
-                fib_setup["id"],
-                fib_setup["trend"],
-                entry,
-                sl,
-                tp,
-                fib_setup["fib_low"],
-                fib_setup["fib_high"],
-                last_swing_discovered_at,
-                datetime.utcnow(),
-            ))
-            conn.commit()
+    def _save_batch(self, conn, symbol, timeframe, rows, fib_ids, chunk_size=1000):
+        """
+        Insert trade setups and mark their fib setups processed on `conn` (caller commits).
+        Returns the inserted trade setups (SELECT *), oldest first.
+        """
+        cur = conn.cursor(dictionary=True)
+        try:
+            for i in range(0, len(rows), chunk_size):
+                batch = rows[i:i + chunk_size]
+                cur.execute(f"""
+                    INSERT INTO strategy_swing_point_fib_trade_setup
+                    (symbol, timeframe, fib_setup_id, trend, entry_price, sl_price, tp_price, fib_low, fib_high, last_swing_discovered_at, created_at)
+                    VALUES {", ".join(["(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"] * len(batch))}
+                """, [value for row in batch for value in row])
 
-            self.logger.info(f"Created Fib Trade Setup for {symbol}-{timeframe}: "
-                             f"{fib_setup['trend']} | Entry={entry} SL={sl} TP={tp}")
+            for i in range(0, len(fib_ids), chunk_size):
+                batch = fib_ids[i:i + chunk_size]
+                cur.execute(f"""
+                    UPDATE strategy_swing_point_fib_setup_major_wave
+                    SET processed=1
+                    WHERE id IN ({", ".join(["%s"] * len(batch))})
+                """, batch)
+
+            saved = []
+            new_fib_ids = [row[2] for row in rows]
+            for i in range(0, len(new_fib_ids), chunk_size):
+                batch = new_fib_ids[i:i + chunk_size]
+                cur.execute(f"""
+                    SELECT *
+                    FROM strategy_swing_point_fib_trade_setup
+                    WHERE fib_setup_id IN ({", ".join(["%s"] * len(batch))}) AND processed=0
+                    ORDER BY last_swing_discovered_at ASC, id ASC
+                """, batch)
+                saved += cur.fetchall()
+        finally:
+            cur.close()
 
-    def _mark_fib_processed(self, fib_id):
-        with get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE strategy_swing_point_fib_setup_major_wave
-                SET processed=1
-                WHERE id=%s
-            """, (fib_id,))
-            conn.commit()
+        for row in rows:
+            self.logger.info(f"Created Fib Trade Setup for {symbol}-{timeframe}: "
+                             f"{row[3]} | Entry={row[4]} SL={row[5]} TP={row[6]}")
+        return saved
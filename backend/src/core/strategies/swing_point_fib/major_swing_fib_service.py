@@ -1,5 +1,6 @@
 # src/core/strategies/swing_point_fib/major_wave_fib_service.py
 
+from collections import deque
 from datetime import datetime
 from decimal import Decimal
 from src.utils.logger import get_logger
@@ -10,118 +11,238 @@ class MajorWaveFibService:
     Major Wave Fibonacci Service
     - Uses last 9 swings to detect trend and define Fibonacci zones
     - Avoids reprocessing the same last swing
+    - Streams only unprocessed swings (plus window_size - 1 preceding ones)
+      through an incremental SwingWindow; setups and processed flags are
+      written in one transaction per run
+    - Swings can be handed over in memory by the previous stage; the last
+      window_size - 1 swings are kept between runs, so the DB is only polled
+      on the first run / after a failure
     """
     def __init__(self, window_size=9):
         self.window_size = window_size
         self.logger = get_logger("SwingPoint_MajorWaveFibService")
+        self._tails: dict[tuple[str, str], list] = {}
 
     # ===================================================
     # Public entrypoint
     # ===================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, conn=None, new_swings=None):
+        """
+        Build fib setups for swings that close a new window. Returns the new setups
+        (id, trend, fib_low, fib_high, last_swing_candle_time, last_swing_discovered_at).
+        new_swings: swings handed over by SwingPointService; None → poll the DB (recovery).
+        With `conn`, writes join the caller's transaction (no commit) and errors propagate.
+        """
+        if conn is not None:
+            return self._process(symbol, timeframe, conn, new_swings)
         try:
-            swings = self._get_recent_swings(symbol, timeframe)
-            if len(swings) < self.window_size:
-                self.logger.info("Not enough swings to process.")
-                return
-
-            # Sliding window over swings
-            for start in range(len(swings) - self.window_size + 1):
-                window = swings[start:start + self.window_size]
-
-                last_swing = window[-1]
-                if last_swing["processed"]:
-                    continue  # skip already processed last swing
-
-                trend = self._detect_trend(window)
-                if trend == "neutral":
-                    self.logger.info(f"Window starting at {window[0]['candle_time']} is neutral, skipping.")
-                    self._mark_swing_processed(last_swing["id"])
-                    continue
-
-                fib_low, fib_high = self._pick_fib_points(window, trend)
-
-                self._save_fib_setup(symbol, timeframe, trend, fib_low, fib_high, last_swing["id"],last_swing["candle_time"],last_swing['discovered_at'])
-                self._mark_swing_processed(last_swing["id"])
-
+            with get_connection() as own_conn:
+                setups = self._process(symbol, timeframe, own_conn, new_swings)
+                own_conn.commit()
+                return setups
         except Exception as e:
+            self.forget(symbol, timeframe)
             self.logger.exception(f"Error in MajorWaveFibService.run_step: {e}")
+            return []
+
+    def forget(self, symbol: str, timeframe: str):
+        """Drop the in-memory window tail; the next run polls the DB."""
+        self._tails.pop((symbol, timeframe), None)
+
+    def _process(self, symbol, timeframe, conn, new_swings):
+        key = (symbol, timeframe)
+        if new_swings is None or key not in self._tails:
+            swings = self._get_unprocessed_swings(conn, symbol, timeframe)
+        elif not new_swings:
+            return []
+        else:
+            swings = self._tails[key] + list(new_swings)
+
+        self._tails[key] = swings[-(self.window_size - 1):] if self.window_size > 1 else []
+        if all(s["processed"] for s in swings):
+            return []  # nothing new since the last run
+        if len(swings) < self.window_size:
+            self.logger.info("Not enough swings to process.")
+            return []
+
+        setups, processed_ids = [], []
+        window = SwingWindow(self.window_size)
+        for swing in swings:
+            window.push(swing)
+            if swing["processed"]:
+                continue  # skip already processed last swing
+            processed_ids.append(swing["id"])
+            swing["processed"] = True
+            if not window.full:
+                # Oldest swings of the history never close a full window; flag them
+                # so the next run doesn't restart from the beginning
+                continue
+
+            trend = window.trend()
+            if trend == "neutral":
+                self.logger.debug(f"Window starting at {window.first['candle_time']} is neutral, skipping.")
+                continue
+
+            fib_low, fib_high = window.fib_points()
+            setups.append((
+                symbol, timeframe, trend, Decimal(fib_low), Decimal(fib_high),
+                swing["id"], swing["candle_time"], swing["discovered_at"], datetime.utcnow()
+            ))
+
+        return self._save_batch(conn, setups, processed_ids)
 
     # ===================================================
     # Helpers
     # ===================================================
-    def _get_recent_swings(self, symbol, timeframe):
-        with get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT id, swing_type, price, candle_time, processed, discovered_at
+    def _get_unprocessed_swings(self, conn, symbol, timeframe):
+        """
+        Swings from the oldest unprocessed one onwards, preceded by the
+        window_size - 1 swings before it (so its first window is complete).
+        If everything is processed, just the newest window_size - 1 swings (the tail).
+        """
+        columns = "id, swing_type, price, candle_time, processed, discovered_at"
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT MIN(candle_time) AS first_time
+            FROM strategy_swing_point
+            WHERE symbol=%s AND timeframe=%s AND processed=0
+        """, (symbol, timeframe))
+        first_time = cursor.fetchone()["first_time"]
+
+        cursor.execute(f"""
+            SELECT {columns}
+            FROM strategy_swing_point
+            WHERE symbol=%s AND timeframe=%s {"AND candle_time < %s" if first_time is not None else ""}
+            ORDER BY candle_time DESC, id DESC
+            LIMIT %s
+        """, (symbol, timeframe, *([first_time] if first_time is not None else []), self.window_size - 1))
+        swings = cursor.fetchall()[::-1]
+
+        if first_time is not None:
+            cursor.execute(f"""
+                SELECT {columns}
                 FROM strategy_swing_point
-                WHERE symbol=%s AND timeframe=%s
-                ORDER BY candle_time ASC
-            """, (symbol, timeframe))
-            swings = cursor.fetchall()
-            # Ensure boolean
-            for s in swings:
-                s["processed"] = bool(s["processed"])
-            return swings
-
-    def _detect_trend(self, window):
+                WHERE symbol=%s AND timeframe=%s AND candle_time >= %s
+                ORDER BY candle_time ASC, id ASC
+            """, (symbol, timeframe, first_time))
+            swings += cursor.fetchall()
+        cursor.close()
+
+        # Ensure boolean
+        for s in swings:
+            s["processed"] = bool(s["processed"])
+        return swings
+
+    def _save_batch(self, conn, setups, processed_ids, chunk_size=1000):
         """
-        Determine trend: bullish, bearish, or neutral
-        - bullish: mostly higher highs and higher lows
-        - bearish: mostly lower highs and lower lows
+        Save Fibonacci setups and mark their swings processed on `conn` (caller commits).
+        Returns the saved setups read back with their ids, oldest first.
         """
-        highs = [s["price"] for s in window if s["swing_type"] == "high"]
-        lows = [s["price"] for s in window if s["swing_type"] == "low"]
+        if not processed_ids:
+            return []
 
-        if len(highs) < 2 or len(lows) < 2:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            for i in range(0, len(setups), chunk_size):
+                batch = setups[i:i + chunk_size]
+                cursor.execute(f"""
+                    INSERT INTO strategy_swing_point_fib_setup_major_wave
+                    (symbol, timeframe, trend, fib_low, fib_high, last_swing_id,last_swing_candle_time, last_swing_discovered_at, created_at)
+                    VALUES {", ".join(["(%s,%s,%s,%s,%s,%s,%s,%s,%s)"] * len(batch))}
+                """, [value for row in batch for value in row])
+
+            for i in range(0, len(processed_ids), chunk_size):
+                batch = processed_ids[i:i + chunk_size]
+                cursor.execute(f"""
+                    UPDATE strategy_swing_point
+                    SET processed=1
+                    WHERE id IN ({", ".join(["%s"] * len(batch))})
+                """, batch)
+
+            saved = []
+            swing_ids = [setup[5] for setup in setups]
+            for i in range(0, len(swing_ids), chunk_size):
+                batch = swing_ids[i:i + chunk_size]
+                cursor.execute(f"""
+                    SELECT id, trend, fib_low, fib_high, last_swing_candle_time, last_swing_discovered_at
+                    FROM strategy_swing_point_fib_setup_major_wave
+                    WHERE last_swing_id IN ({", ".join(["%s"] * len(batch))}) AND processed=0
+                    ORDER BY last_swing_discovered_at ASC, id ASC
+                """, batch)
+                saved += cursor.fetchall()
+        finally:
+            cursor.close()
+
+        for setup in setups[-5:]:
+            self.logger.info(f"Saved Fibonacci setup: {setup[2]} {setup[3]}-{setup[4]}")
+        self.logger.info(f"Saved {len(setups)} Fibonacci setups, marked {len(processed_ids)} swings processed")
+        return saved
+
+
+class SwingWindow:
+    """
+    Fixed-size sliding window over swings.
+    Keeps the window's highs/lows in order plus monotonic deques for
+    max(high)/min(low), so every push and query is amortized O(1).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._seq = 0
+        self._swings = deque()       # (seq, swing)
+        self._highs = deque()        # (seq, price) in window order
+        self._lows = deque()
+        self._max_high = deque()     # decreasing prices → front is the max
+        self._min_low = deque()      # increasing prices → front is the min
+
+    @property
+    def full(self) -> bool:
+        return len(self._swings) == self.size
+
+    @property
+    def first(self):
+        return self._swings[0][1]
+
+    def push(self, swing):
+        seq = self._seq
+        self._seq += 1
+        self._swings.append((seq, swing))
+        price = swing["price"]
+
+        if swing["swing_type"] == "high":
+            self._highs.append((seq, price))
+            while self._max_high and self._max_high[-1][1] <= price:
+                self._max_high.pop()
+            self._max_high.append((seq, price))
+        elif swing["swing_type"] == "low":
+            self._lows.append((seq, price))
+            while self._min_low and self._min_low[-1][1] >= price:
+                self._min_low.pop()
+            self._min_low.append((seq, price))
+
+        if len(self._swings) > self.size:
+            old_seq, _ = self._swings.popleft()
+            for side in (self._highs, self._lows, self._max_high, self._min_low):
+                if side and side[0][0] == old_seq:
+                    side.popleft()
+
+    def trend(self) -> str:
+        """
+        Determine trend: bullish, bearish, or neutral
+        - bullish: last high/low above the window's first high/low
+        - bearish: last high/low below the window's first high/low
+        """
+        if len(self._highs) < 2 or len(self._lows) < 2:
             return "neutral"
 
-        # Compare first vs last swing in window
-        if highs[-1] > highs[0] and lows[-1] > lows[0]:
+        first_high, last_high = self._highs[0][1], self._highs[-1][1]
+        first_low, last_low = self._lows[0][1], self._lows[-1][1]
+        if last_high > first_high and last_low > first_low:
             return "bullish"
-        elif highs[-1] < highs[0] and lows[-1] < lows[0]:
+        elif last_high < first_high and last_low < first_low:
             return "bearish"
-        else:
-            return "neutral"
+        return "neutral"
 
-    def _pick_fib_points(self, window, trend):
-        """
-        Pick Fibonacci high/low based on trend
-        """
-        highs = [s["price"] for s in window if s["swing_type"] == "high"]
-        lows = [s["price"] for s in window if s["swing_type"] == "low"]
-
-        if trend == "bullish":
-            fib_low = min(lows)
-            fib_high = max(highs)
-        elif trend == "bearish":
-            fib_low = min(lows)
-            fib_high = max(highs)
-        else:
-            fib_low, fib_high = None, None
-        return Decimal(fib_low), Decimal(fib_high)
-
-    def _save_fib_setup(self, symbol, timeframe, trend, fib_low, fib_high, last_swing_id, last_swing_time, last_swing_discovered_at):
-        """
-        Save Fibonacci setup in DB
-        """
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO strategy_swing_point_fib_setup_major_wave
-                (symbol, timeframe, trend, fib_low, fib_high, last_swing_id,last_swing_candle_time, last_swing_discovered_at, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (symbol, timeframe, trend, fib_low, fib_high, last_swing_id,last_swing_time, last_swing_discovered_at, datetime.utcnow()))
-            conn.commit()
-            self.logger.info(f"Saved Fibonacci setup: {trend} {fib_low}-{fib_high}")
-
-    def _mark_swing_processed(self, swing_id):
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE strategy_swing_point
-                SET processed=1
-                WHERE id=%s
-            """, (swing_id,))
-            conn.commit()
+    def fib_points(self):
+        """(fib_low, fib_high) = lowest low and highest high in the window (same for both trends)."""
+        return self._min_low[0][1], self._max_high[0][1]
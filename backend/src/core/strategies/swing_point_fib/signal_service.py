@@ -1,55 +1,70 @@
-from datetime import datetime
-from decimal import Decimal
+import calendar
+import numpy as np
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
 from src.core.db.signals import insert_signal
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.candle_store import CandleStore
 
 
 class MajorWaveFibSignalService:
     """
     Converts unprocessed Fibonacci trade setups into main signal format.
-    - Simulates candles from discovery date to current
+    - Optionally (check_entry_hit) drops setups whose entry was already touched
+      after discovery; candles are only loaded when that check is on
     - Converts to standard bot signal format like EntryToSignalService
+    - Trade setups can be handed over in memory by MajorWaveFibTradeSetupService;
+      unprocessed rows are polled from the DB only when none are handed over
     """
 
-    def __init__(self):
+    def __init__(self, check_entry_hit=False):
         self.logger = get_logger("SwingPoint_MajorWaveFibSignalService")
+        self.check_entry_hit = check_entry_hit
+        # (symbol, timeframe) → (candle count, suffix_high, suffix_low); rebuilt when candles are appended
+        self._suffix_cache: dict[tuple[str, str], tuple] = {}
 
     # ===================================================
     # MAIN RUN
     # ===================================================
-    def run_step(self, symbol: str, timeframe: str):
-        setups = self._get_unprocessed_trade_setups(symbol, timeframe)
+    def run_step(self, symbol: str, timeframe: str, conn=None, trade_setups=None):
+        """
+        Convert new trade setups to signals and mark them processed.
+        trade_setups: handed over by the trade setup stage; None → poll processed=0 rows (recovery).
+        With `conn`, writes join the caller's transaction (no commit) and errors propagate.
+        """
+        if conn is not None:
+            return self._process(symbol, timeframe, conn, trade_setups)
+        with get_connection() as own_conn:
+            self._process(symbol, timeframe, own_conn, trade_setups)
+            own_conn.commit()
+
+    def _process(self, symbol, timeframe, conn, trade_setups):
+        setups = self._get_unprocessed_trade_setups(conn, symbol, timeframe) if trade_setups is None else trade_setups
         if not setups:
             self.logger.info(f"No trade setups to process for {symbol}-{timeframe}")
             return
 
-        df_candles = self._prepare_candles(self._get_recent_candles(symbol, timeframe))
-
-        for setup in setups:
-            entry = Decimal(setup["entry_price"])
-            trend = setup["trend"]
-
-            # Filter candles after discovery
-            df_filtered = df_candles[df_candles["timestamp"] >= setup["last_swing_discovered_at"]]
+        already_hit = self._entry_already_hit(symbol, timeframe, setups) if self.check_entry_hit else None
 
+        for i, setup in enumerate(setups):
             # Skip if entry already hit
-            # if self._entry_already_hit(df_filtered, entry, trend):
-            #     self.logger.info(f"Entry already hit for setup {setup['id']}, marking processed")
-            #     self._mark_trade_setup_processed(setup["id"])
-            #     continue
+            if already_hit is not None and already_hit[i]:
+                self.logger.info(f"Entry already hit for setup {setup['id']}, marking processed")
+                continue
 
             # Convert to standard bot signal
-            self._convert_to_signal(setup)
+            self._convert_to_signal(setup, conn)
 
-            # Mark setup as processed
-            self._mark_trade_setup_processed(setup["id"])
+        # Mark setups as processed
+        self._mark_trade_setups_processed(conn, [setup["id"] for setup in setups])
 
     # ===================================================
     # CONVERT TO SIGNAL
     # ===================================================
-    def _convert_to_signal(self, setup):
+    def _convert_to_signal(self, setup, conn=None):
+        """
+        Insert the setup as a bot signal. With `conn` a failure is re-raised, so the
+        tick's transaction rolls back instead of marking the setup processed without a signal.
+        """
         try:
             action = "buy" if setup["trend"] == "bullish" else "sell"
 
@@ -65,60 +80,82 @@ class MajorWaveFibSignalService:
                 "message": f"Entry from Fib trade setup ID {setup['id']}.",
             }
 
-            insert_signal(signal)
+            insert_signal(signal, conn=conn)
             self.logger.info(f"✅ Converted Fib setup #{setup['id']} to signal | {action.upper()} Entry={setup['entry_price']:.2f}")
 
         except Exception as e:
             self.logger.error(f"❌ Failed to convert Fib setup #{setup['id']}: {e}")
+            if conn is not None:
+                raise
 
     # ===================================================
     # DATABASE OPS
     # ===================================================
-    def _get_unprocessed_trade_setups(self, symbol, timeframe):
-        with get_connection() as conn:
-            cur = conn.cursor(dictionary=True)
-            cur.execute("""
-                SELECT *
-                FROM strategy_swing_point_fib_trade_setup
-                WHERE symbol=%s AND timeframe=%s AND processed=0
-                ORDER BY last_swing_discovered_at ASC
-                
-            """, (symbol, timeframe))
-            return cur.fetchall()
-
-    def _mark_trade_setup_processed(self, setup_id):
-        with get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("""
+    def _get_unprocessed_trade_setups(self, conn, symbol, timeframe):
+        cur = conn.cursor(dictionary=True)
+        cur.execute("""
+            SELECT *
+            FROM strategy_swing_point_fib_trade_setup
+            WHERE symbol=%s AND timeframe=%s AND processed=0
+            ORDER BY last_swing_discovered_at ASC
+            
+        """, (symbol, timeframe))
+        setups = cur.fetchall()
+        cur.close()
+        return setups
+
+    def _mark_trade_setups_processed(self, conn, setup_ids, chunk_size=1000):
+        cur = conn.cursor()
+        for i in range(0, len(setup_ids), chunk_size):
+            batch = setup_ids[i:i + chunk_size]
+            cur.execute(f"""
                 UPDATE strategy_swing_point_fib_trade_setup
                 SET processed=1
-                WHERE id=%s
-            """, (setup_id,))
-            conn.commit()
+                WHERE id IN ({", ".join(["%s"] * len(batch))})
+            """, batch)
+        cur.close()
 
     # ===================================================
     # CANDLES
     # ===================================================
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(5000).reset_index(drop=True)
-
-    def _prepare_candles(self, df):
-        if "timestamp" not in df.columns:
-            if "time" in df.columns:
-                df["timestamp"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-            else:
-                df["timestamp"] = df.iloc[:, 0].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-        df["timestamp"] = df["timestamp"].apply(lambda x: x.replace(microsecond=0))
-        return df
-
-    def _entry_already_hit(self, df, entry, trend):
-        entry_f = float(entry)
-        if trend == "bullish":
-            return (df["high"].astype(float) >= entry_f).any()
-        elif trend == "bearish":
-            return (df["low"].astype(float) <= entry_f).any()
-        return False
+    def _entry_already_hit(self, symbol, timeframe, setups):
+        """
+        For each setup: did any candle at/after last_swing_discovered_at touch the entry?
+        One searchsorted over the cached time array plus suffix max(high)/min(low),
+        so every setup is an O(1) lookup instead of a DataFrame mask.
+        """
+        candles = CandleStore.get_instance().get_candles(symbol, timeframe)
+        hit = np.zeros(len(setups), dtype=bool)
+        if candles.is_empty:
+            return hit
+
+        suffix_high, suffix_low = self._suffix_extremes(symbol, timeframe, candles)
+
+        discovered = np.array(
+            [calendar.timegm(setup["last_swing_discovered_at"].utctimetuple()) for setup in setups], dtype=np.int64
+        )
+        start = np.searchsorted(candles.time, discovered, side="left")
+        has_candles = start < len(candles)
+        start = np.minimum(start, len(candles) - 1)
+
+        entry = np.array([float(setup["entry_price"]) for setup in setups])
+        bullish = np.array([setup["trend"] == "bullish" for setup in setups])
+        bearish = np.array([setup["trend"] == "bearish" for setup in setups])
+        hit = has_candles & (
+            (bullish & (suffix_high[start] >= entry)) | (bearish & (suffix_low[start] <= entry))
+        )
+        return hit
+
+    def _suffix_extremes(self, symbol, timeframe, candles):
+        """
+        suffix_high[i] = max(high[i:]), suffix_low[i] = min(low[i:]) — cached per Candles object
+        (the CandleStore builds a new one on every top-up or reload, even if the count is unchanged).
+        """
+        cached = self._suffix_cache.get((symbol, timeframe))
+        if cached is not None and cached[0] is candles:
+            return cached[1], cached[2]
+
+        suffix_high = np.maximum.accumulate(candles.high[::-1])[::-1]
+        suffix_low = np.minimum.accumulate(candles.low[::-1])[::-1]
+        self._suffix_cache[(symbol, timeframe)] = (candles, suffix_high, suffix_low)
+        return suffix_high, suffix_low
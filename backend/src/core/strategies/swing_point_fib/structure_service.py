@@ -1,139 +1,255 @@
+import calendar
 import pandas as pd
 from datetime import datetime
 from src.utils.logger import get_logger
 from src.core.db.connection import get_connection
-from src.core.db.get_data_xauusdc import get_data_m15_xauusdc
+from src.core.db.ohlc_repository import fetch_candles
+from src.core.strategies.swing_point_fib.swing_engine import detect_loose_swings, detect_strict_swings, PowerScorer
 
 
 class SwingPointService:
     """
     Independent service to record swing highs and lows into the DB.
     Supports both major trend and mini-wave (scalping) swings.
+    Keeps a per-(symbol, timeframe) watermark — time of the last candle already
+    evaluated as a confirmed swing centre — and only evaluates newer candles.
     """
 
+    # Candles kept before the watermark so windows and power scores see full history
+    CONTEXT_CANDLES = 20
+
     def __init__(self, mode="strict"):
         self.mode = mode
         self.logger = get_logger("Swing_Point_SwingPointService")
+        self._watermarks: dict[tuple[str, str], int] = {}
+        self._pending: list[tuple] = []
+        # None = not checked yet; see _has_swing_unique_key
+        self._unique_key = None
 
     # ===================================================
     # Public entrypoint
     # ===================================================
-    def run_step(self, symbol: str, timeframe: str):
+    def run_step(self, symbol: str, timeframe: str, conn=None):
+        """
+        Detect and store new swings. Returns the newly stored swings
+        (id, swing_type, price, candle_time, processed, discovered_at), oldest first.
+        With `conn`, writes join the caller's transaction (no commit) and errors propagate.
+        """
+        if conn is not None:
+            return self._process(symbol, timeframe, conn)
         try:
-            df = self._get_recent_candles(symbol, timeframe)
-            if df is None or len(df) < 10:
-                return
+            with get_connection() as own_conn:
+                new_swings = self._process(symbol, timeframe, own_conn)
+                own_conn.commit()
+                return new_swings
+        except Exception as e:
+            self.forget(symbol, timeframe)
+            self.logger.exception(f"Error in SwingPointService.run_step: {e}")
+            return []
 
-            df = self._prepare_candles(df)
+    def forget(self, symbol: str, timeframe: str):
+        """Drop the in-memory watermark (after a rolled-back tick); the next run resumes from the DB."""
+        self._watermarks.pop((symbol, timeframe), None)
 
-            if self.mode == "loose":
-                self._detect_swing_loose(df, symbol, timeframe)
-            else:
-                self._detect_swing_strict(df, symbol, timeframe)
+    def _process(self, symbol, timeframe, conn):
+        watermark = self._get_watermark(symbol, timeframe)
+        df = self._get_candles_since(symbol, timeframe, watermark)
+        if df is None or len(df) < 10:
+            return []
 
-        except Exception as e:
-            self.logger.exception(f"Error in SwingPointService.run_step: {e}")
+        df = self._prepare_candles(df)
+
+        self._pending = []
+        if self.mode == "loose":
+            last_evaluated = self._detect_swing_loose(df, symbol, timeframe, after=watermark)
+        else:
+            last_evaluated = self._detect_swing_strict(df, symbol, timeframe, after=watermark)
+
+        inserted, skipped, new_swings = self._flush_swings(conn)
+        if inserted or skipped:
+            self.logger.info(f"🧾 {symbol}-{timeframe} swings: {inserted} inserted, {skipped} skipped (already stored)")
+
+        if last_evaluated is not None and (watermark is None or last_evaluated > watermark):
+            self._watermarks[(symbol, timeframe)] = last_evaluated
+        return new_swings
 
     # ===================================================
     # Swing Detection
     # ===================================================
-    def _detect_swing_loose(self, df, symbol, timeframe):
-        for i in range(1, len(df)):
-            prev = df.iloc[i - 1]
-            curr = df.iloc[i]
-
-            if curr["high"] > prev["high"]:
-                power = self._calculate_power_score(df, i, "high")
-                self._record_swing(symbol, timeframe, "high", curr["high"], curr["timestamp"], source="loose", power_score=power)
-
-            if curr["low"] < prev["low"]:
-                power = self._calculate_power_score(df, i, "low")
-                self._record_swing(symbol, timeframe, "low", curr["low"], curr["timestamp"], source="loose", power_score=power)
+    def _detect_swing_loose(self, df, symbol, timeframe, after=None):
+        """Record loose swings on candles with time > after. Returns the last evaluated candle time."""
+        high_idx, low_idx = detect_loose_swings(df["high"].values, df["low"].values)
+        scorer = PowerScorer(df)
+        timestamps = df["timestamp"].values
+        times = df["time"].to_numpy(dtype="int64")
+
+        for i, swing_type, power in self._ordered_swings(high_idx, low_idx, scorer):
+            if after is not None and times[i] <= after:
+                continue
+            price = df["high"].iat[i] if swing_type == "high" else df["low"].iat[i]
+            swing_time = pd.to_datetime(timestamps[i]).to_pydatetime()
+            self._record_swing(symbol, timeframe, swing_type, price, swing_time, source="loose", power_score=power)
+        return int(times[-1])
 
-    def _detect_swing_strict(self, df, symbol, timeframe, window_size=3):
+    def _detect_swing_strict(self, df, symbol, timeframe, window_size=3, after=None):
+        """
+        Record strict swings on candles with time > after.
+        Returns the time of the last confirmed centre (window_size candles after it exist), or None.
+        """
         highs, lows, timestamps = df["high"].values, df["low"].values, df["timestamp"].values
+        times = df["time"].to_numpy(dtype="int64")
+        high_idx, low_idx = detect_strict_swings(highs, lows, window_size)
+        scorer = PowerScorer(df)
 
-        for i in range(window_size, len(df) - window_size):
+        for i, swing_type, power in self._ordered_swings(high_idx, low_idx, scorer):
+            if after is not None and times[i] <= after:
+                continue
             swing_time = pd.to_datetime(timestamps[i]).to_pydatetime()
             discovered_at = pd.to_datetime(timestamps[i + window_size]).to_pydatetime()
+            price = highs[i] if swing_type == "high" else lows[i]
+            self._record_swing(symbol, timeframe, swing_type, price, swing_time, source="strict", power_score=power, discovered_at=discovered_at)
 
-            if highs[i] == max(highs[i - window_size:i + window_size + 1]):
-                power = self._calculate_power_score(df, i, "high")
-                self._record_swing(symbol, timeframe, "high", highs[i], swing_time, source="strict", power_score=power, discovered_at=discovered_at)
+        last_centre = len(df) - window_size - 1
+        return int(times[last_centre]) if last_centre >= window_size else None
 
-            if lows[i] == min(lows[i - window_size:i + window_size + 1]):
-                power = self._calculate_power_score(df, i, "low")
-                self._record_swing(symbol, timeframe, "low", lows[i], swing_time, source="strict", power_score=power, discovered_at=discovered_at)
+    @staticmethod
+    def _ordered_swings(high_idx, low_idx, scorer):
+        """(index, swing_type, power) by candle, high before low — same order as the old per-candle loop."""
+        swings = list(zip(high_idx.tolist(), ["high"] * len(high_idx), scorer.scores(high_idx, "high")))
+        swings += zip(low_idx.tolist(), ["low"] * len(low_idx), scorer.scores(low_idx, "low"))
+        return sorted(swings, key=lambda s: (s[0], s[1] != "high"))
 
     # ===================================================
     # Record swing in DB
     # ===================================================
     def _record_swing(self, symbol, timeframe, swing_type, price, candle_time,
                       source="strict", power_score=1.0, discovered_at=None):
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id FROM strategy_swing_point
-                WHERE symbol=%s AND timeframe=%s AND swing_type=%s AND candle_time=%s
-            """, (symbol, timeframe, swing_type, candle_time))
-
-            if cursor.fetchone():
-                return
-
-            cursor.execute("""
-                INSERT INTO strategy_swing_point
-                (symbol, timeframe, swing_type, price, candle_time, discovered_at, power_score, source, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                symbol, timeframe, swing_type, price,
-                candle_time, discovered_at or candle_time,
-                power_score, source, datetime.utcnow()
-            ))
-            conn.commit()
-
-    # ===================================================
-    # Power Score Calculation
-    # ===================================================
-    def _calculate_power_score(self, df, idx, swing_type, lookback=10):
+        """Queue a swing; everything found in one run_step is written by _flush_swings."""
+        self._pending.append((
+            symbol, timeframe, swing_type, float(price),
+            candle_time, discovered_at or candle_time,
+            power_score, source, datetime.utcnow()
+        ))
+
+    def _flush_swings(self, conn, rows_per_statement=1000):
         """
-        Compute power score based on volatility, range, and structure strength.
-        Returns value typically between 0.5–3.0
+        Write queued swings with multi-row INSERT IGNORE on `conn` (caller commits).
+        Duplicates are dropped by UNIQUE(symbol, timeframe, swing_type, candle_time);
+        if the table lacks that key, already stored swings are filtered with one SELECT.
+        Returns (inserted, skipped, new_swings) — new_swings read back with their ids.
         """
-        try:
-            avg_range = df["high"].sub(df["low"]).rolling(lookback).mean().iloc[idx]
-            curr_range = df["high"].iloc[idx] - df["low"].iloc[idx]
-
-            # Recent momentum (close movement over last few candles)
-            momentum = abs(df["close"].iloc[idx] - df["close"].iloc[max(0, idx - 3)]) / avg_range
+        rows, self._pending = self._pending, []
+        if not rows:
+            return 0, 0, []
 
-            # Strength factor (how extreme is it vs recent swings)
-            if swing_type == "high":
-                prev_extreme = df["high"].iloc[max(0, idx - lookback):idx].max()
-                extremity = (df["high"].iloc[idx] - prev_extreme) / avg_range
-            else:
-                prev_extreme = df["low"].iloc[max(0, idx - lookback):idx].min()
-                extremity = (prev_extreme - df["low"].iloc[idx]) / avg_range
-
-            power = 0.5 + (curr_range / avg_range) * 0.3 + momentum * 0.3 + extremity * 0.4
-            return round(max(0.5, min(power, 5.0)), 2)
-        except Exception:
-            return 1.0
+        inserted = 0
+        cursor = conn.cursor()
+        try:
+            new_rows = rows if self._has_swing_unique_key(cursor) else self._filter_stored(cursor, rows)
+            for i in range(0, len(new_rows), rows_per_statement):
+                batch = new_rows[i:i + rows_per_statement]
+                cursor.execute(f"""
+                    INSERT IGNORE INTO strategy_swing_point
+                    (symbol, timeframe, swing_type, price, candle_time, discovered_at, power_score, source, created_at)
+                    VALUES {", ".join(["(%s,%s,%s,%s,%s,%s,%s,%s,%s)"] * len(batch))}
+                """, [value for row in batch for value in row])
+                inserted += cursor.rowcount
+        finally:
+            cursor.close()
+
+        new_swings = self._read_back(conn, new_rows) if inserted else []
+        return inserted, len(rows) - inserted, new_swings
+
+    @staticmethod
+    def _read_back(conn, rows):
+        """Stored, unprocessed versions of `rows` (with ids) for the next stage, oldest first."""
+        symbol, timeframe = rows[0][0], rows[0][1]
+        keys = {(row[2], row[4]) for row in rows}
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, swing_type, price, candle_time, processed, discovered_at
+            FROM strategy_swing_point
+            WHERE symbol=%s AND timeframe=%s AND candle_time >= %s AND processed=0
+            ORDER BY candle_time ASC, id ASC
+        """, (symbol, timeframe, min(row[4] for row in rows)))
+        swings = [s for s in cursor.fetchall() if (s["swing_type"], s["candle_time"]) in keys]
+        cursor.close()
+        for s in swings:
+            s["processed"] = bool(s["processed"])
+        return swings
+
+    def _has_swing_unique_key(self, cursor):
+        if self._unique_key is None:
+            cursor.execute("SHOW INDEX FROM strategy_swing_point WHERE Non_unique = 0")
+            columns = {}
+            for row in cursor.fetchall():
+                # SHOW INDEX: Key_name is column 2, Column_name column 4
+                columns.setdefault(row[2], set()).add(row[4])
+            self._unique_key = {"symbol", "timeframe", "swing_type", "candle_time"} in columns.values()
+            if not self._unique_key:
+                self.logger.warning(
+                    "strategy_swing_point has no UNIQUE(symbol, timeframe, swing_type, candle_time); "
+                    "falling back to SELECT-based dedup. Add it with: ALTER TABLE strategy_swing_point "
+                    "ADD UNIQUE KEY uq_swing_point (symbol, timeframe, swing_type, candle_time)"
+                )
+        return self._unique_key
+
+    @staticmethod
+    def _filter_stored(cursor, rows):
+        """Drop rows already in strategy_swing_point (one range SELECT per symbol/timeframe batch)."""
+        symbol, timeframe = rows[0][0], rows[0][1]
+        times = [row[4] for row in rows]
+        cursor.execute("""
+            SELECT swing_type, candle_time FROM strategy_swing_point
+            WHERE symbol=%s AND timeframe=%s AND candle_time BETWEEN %s AND %s
+        """, (symbol, timeframe, min(times), max(times)))
+        stored = set(cursor.fetchall())
+        return [row for row in rows if (row[2], row[4]) not in stored]
 
     # ===================================================
     # Helpers
     # ===================================================
-    def _get_recent_candles(self, symbol, timeframe):
-        if symbol == "XAUUSDc" and timeframe == "M15":
-            df = get_data_m15_xauusdc()
-        else:
-            raise ValueError(f"No data function for {symbol}-{timeframe}")
-        return df.tail(5000).reset_index(drop=True)
+    def _get_recent_candles(self, symbol, timeframe, limit=5000):
+        return fetch_candles(symbol, timeframe, limit=limit)
+
+    def _get_candles_since(self, symbol, timeframe, watermark, limit=5000):
+        """
+        Candles after the watermark plus CONTEXT_CANDLES before it (last `limit` candles if no watermark).
+        None if there is nothing new or the context read failed, so the watermark does not advance.
+        """
+        if watermark is None:
+            return self._get_recent_candles(symbol, timeframe, limit=limit)
+
+        context = fetch_candles(symbol, timeframe, limit=self.CONTEXT_CANDLES, end=watermark + 1)
+        if context.empty:
+            # Candles up to the watermark exist, so this is a failed read: without the
+            # left-hand windows, swings in the first new candles would be skipped for good
+            self.logger.warning(f"⚠️ {symbol}-{timeframe}: no context candles before the watermark, retrying next run")
+            return None
+        new_rows = fetch_candles(symbol, timeframe, start=watermark + 1)
+        if new_rows.empty:
+            return None
+        return pd.concat([context, new_rows], ignore_index=True)
+
+    def _get_watermark(self, symbol, timeframe):
+        """In-memory watermark; after a restart, resume from the newest swing already stored."""
+        key = (symbol, timeframe)
+        if key not in self._watermarks:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT MAX(candle_time) FROM strategy_swing_point
+                    WHERE symbol=%s AND timeframe=%s AND source=%s
+                """, (symbol, timeframe, self.mode))
+                row = cursor.fetchone()
+                cursor.close()
+            if row and row[0] is not None:
+                self._watermarks[key] = calendar.timegm(row[0].utctimetuple())
+        return self._watermarks.get(key)
 
     def _prepare_candles(self, df):
         if "timestamp" not in df.columns:
-            if "time" in df.columns:
-                df["timestamp"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-            else:
-                df["timestamp"] = df.iloc[:, 0].apply(lambda x: datetime.utcfromtimestamp(int(x)))
-        df["timestamp"] = df["timestamp"].apply(lambda x: x.replace(microsecond=0))
+            seconds = df["time"] if "time" in df.columns else df.iloc[:, 0]
+            df["timestamp"] = pd.to_datetime(seconds.astype("int64"), unit="s")
+        df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.floor("s")
         return df
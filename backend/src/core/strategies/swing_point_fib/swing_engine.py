@@ -0,0 +1,73 @@
+# src/core/strategies/swing_point_fib/swing_engine.py
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def detect_strict_swings(highs: np.ndarray, lows: np.ndarray, window_size: int = 3):
+    """
+    Indices i (window_size <= i < n - window_size) where highs[i] / lows[i]
+    is the max / min of the centred 2 * window_size + 1 window.
+    Returns (high_idx, low_idx), both ascending.
+    """
+    n = len(highs)
+    span = 2 * window_size + 1
+    if n < span:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    centre = slice(window_size, n - window_size)
+    high_idx = np.flatnonzero(highs[centre] == sliding_window_view(highs, span).max(axis=1)) + window_size
+    low_idx = np.flatnonzero(lows[centre] == sliding_window_view(lows, span).min(axis=1)) + window_size
+    return high_idx, low_idx
+
+
+def detect_loose_swings(highs: np.ndarray, lows: np.ndarray):
+    """Indices i >= 1 with a higher high / lower low than candle i - 1."""
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    return np.flatnonzero(highs[1:] > highs[:-1]) + 1, np.flatnonzero(lows[1:] < lows[:-1]) + 1
+
+
+class PowerScorer:
+    """
+    Power scores for any candle, from rolling statistics computed once per frame.
+    0.5 + range_ratio * 0.3 + momentum * 0.3 + extremity * 0.4, clamped to [0.5, 5.0];
+    candles without a full lookback window score 0.5.
+
+    Behaviour change: the former per-swing _calculate_power_score received DECIMAL
+    prices as Decimal, raised TypeError and fell back to 1.0, so swings stored before
+    float64 candles almost always have power_score = 1.0. Real scores are stored now;
+    thresholds on power_score see a different distribution than the historical rows.
+    """
+
+    def __init__(self, df: pd.DataFrame, lookback: int = 10):
+        high, low, close = df["high"], df["low"], df["close"]
+        self.high = high.to_numpy(dtype=np.float64)
+        self.low = low.to_numpy(dtype=np.float64)
+        self.close = close.to_numpy(dtype=np.float64)
+        self.avg_range = high.sub(low).rolling(lookback).mean().to_numpy(dtype=np.float64)
+        # Extreme of the `lookback` candles before each index (NaN at index 0)
+        self.prev_high = high.rolling(lookback, min_periods=1).max().shift(1).to_numpy(dtype=np.float64)
+        self.prev_low = low.rolling(lookback, min_periods=1).min().shift(1).to_numpy(dtype=np.float64)
+
+    def scores(self, idx: np.ndarray, swing_type: str) -> list[float]:
+        idx = np.asarray(idx, dtype=np.int64)
+        if idx.size == 0:
+            return []
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_range = self.avg_range[idx]
+            curr_range = self.high[idx] - self.low[idx]
+            momentum = np.abs(self.close[idx] - self.close[np.maximum(0, idx - 3)]) / avg_range
+            if swing_type == "high":
+                extremity = (self.high[idx] - self.prev_high[idx]) / avg_range
+            else:
+                extremity = (self.prev_low[idx] - self.low[idx]) / avg_range
+            power = 0.5 + (curr_range / avg_range) * 0.3 + momentum * 0.3 + extremity * 0.4
+
+        power = np.where(np.isnan(power), 0.5, np.clip(power, 0.5, 5.0))
+        # Python round() per value, to match the scores already stored
+        return [round(float(p), 2) for p in power]
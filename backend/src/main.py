@@ -70,19 +70,19 @@ async def start_scheduler():
     swing_point_service = StrategySwingPointService(
     symbol="XAUUSDc",
     timeframe="M15",
-    interval=60
+    interval=900  # fallback only — runs on M15 candle-close events
     )
     from src.services.strategy_bos_fvg_retrace_service import StrategyBosFvgRetraceService
     bos_fvg_retrace_service = StrategyBosFvgRetraceService(
     symbol="XAUUSDc",
     timeframe="M15",
-    interval=60  
+    interval=900  # fallback only — runs on M15 candle-close events
 )
     from src.services.strategy_liq_sweep_rejection_service import StrategyLiqSweepRejectionService
     liq_sweep_rejection_service = StrategyLiqSweepRejectionService(
     symbol="XAUUSDc",
     timeframe="M15",
-    interval=60
+    interval=900  # fallback only — runs on M15 candle-close events
     )
     from src.services.account_metric_update_service import AccountMetricUpdateService
     account_metric_update_service = AccountMetricUpdateService(interval=300)  # 5 minutes
@@ -1,6 +1,7 @@
 # src/services/base_service.py
 import asyncio
 import traceback
+from src.core.candle_events import CandleEventBus
 from src.utils.logger import get_logger
 
 class BaseService:
@@ -45,3 +46,48 @@ class BaseService:
 
     async def run_once(self):
         raise NotImplementedError
+
+
+class CandleDrivenService(BaseService):
+    """
+    BaseService that runs once per closed candle of symbol/timeframe
+    (CandleClosed events from DataPipelineService) instead of on a fixed timer.
+    `interval` is only a fallback: with no event for that long, run anyway
+    (e.g. the data pipeline is stopped).
+    """
+
+    def __init__(self, name: str, symbol: str, timeframe: str, interval: int = 900):
+        super().__init__(name, interval=interval)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.last_bar_time = None
+
+    async def _loop(self):
+        bus = CandleEventBus.get_instance()
+        queue = bus.subscribe(self.symbol, self.timeframe)
+        try:
+            # Catch up once on start, then wait for bar closes
+            await self.run_once()
+            while self.running:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    self.logger.info(f"No {self.symbol}-{self.timeframe} candle event for {self.interval}s, running anyway.")
+                    await self.run_once()
+                    continue
+
+                # Several events may be queued while a run was in progress → one run for the newest
+                while not queue.empty():
+                    event = queue.get_nowait()
+                if self.last_bar_time is not None and event.time <= self.last_bar_time:
+                    continue
+                self.last_bar_time = event.time
+                await self.run_once()
+        except asyncio.CancelledError:
+            self.logger.info("Loop cancelled.")
+        except Exception as e:
+            self.logger.error(f"Service error: {e}")
+            traceback.print_exc()
+        finally:
+            bus.unsubscribe(queue)
+            self.running = False
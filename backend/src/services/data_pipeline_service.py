@@ -1,51 +1,101 @@
 # src/services/data_pipeline_service.py
 import asyncio
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+from typing import Callable
 
 from src.services.base_service import BaseService
 from src.utils.logger import get_logger
 from src.services.mt5_client import MT5Client
-from src.core.mt5.data_pipeline_presets import (
-    data_fetcher_xauusdc_m15,
-    data_fetcher_xauusdc_m30,
-    data_fetcher_xauusdc_h1,
-    data_fetcher_xauusdc_h4,
-    data_fetcher_xauusdc_d1,
-)
+from src.core.mt5.data_pipeline_presets import PIPELINE_REGISTRY, PipelineSpec, build_fetcher
+from src.core.mt5.data_fetcher import MT5DataFetcher
+from src.core.db.ohlc_repository import TIMEFRAME_SECONDS
+from src.core.candle_events import CandleEventBus, CandleClosed
 
 logger = get_logger("service.data_pipeline_service")
 
+# Max pipelines talking to MT5 / the DB at the same time
+MAX_WORKERS = int(os.getenv("DATA_PIPELINE_WORKERS", "4"))
+
+
+@dataclass
+class PipelineJob:
+    """
+    A periodic job (fetch or derived-bar check) and its scheduling state.
+    With bar_seconds, the job also runs close_delay seconds after every bar close.
+    """
+    label: str
+    func: Callable
+    interval: int
+    next_run: float = 0.0
+    busy: bool = False
+    bar_seconds: int = 0
+    close_delay: int = 0
+
+    def schedule_after(self, start: float):
+        """Set next_run (monotonic) from a run that started at `start`."""
+        self.next_run = start + self.interval
+        if self.bar_seconds:
+            now = time.time()
+            next_close = (now // self.bar_seconds + 1) * self.bar_seconds + self.close_delay
+            # Still inside the delay window of the bar that just closed
+            if now < next_close - self.bar_seconds:
+                next_close -= self.bar_seconds
+            self.next_run = min(self.next_run, time.monotonic() + next_close - now)
 
-class DataPipelineService(BaseService):
-    """Service to run data update pipelines for multiple timeframes"""
 
-    def __init__(self, name="DataPipelineService"):
-        # BaseService interval isn’t used directly because each loop manages its own timing
+class DataPipelineService(BaseService):
+    """
+    Service to run the data update pipelines declared in PIPELINE_REGISTRY.
+    Each entry gets one MT5 fetch job (higher timeframes are derived from it
+    in the same transaction) plus a low-frequency check against MT5.
+    The fetch job runs right after each base bar closes (plus a small delay),
+    and after each committed sync a CandleClosed event is published per timeframe
+    that got a new bar, so strategies run on bar close instead of polling.
+    A single scheduler loop dispatches due jobs to a shared worker pool,
+    so at most MAX_WORKERS of them hit MT5 at once. Jobs of the same symbol
+    (sync and derived-bar check) hold a per-symbol lock, so they never overlap.
+    """
+
+    def __init__(self, name="DataPipelineService", registry: list[PipelineSpec] = None, max_workers: int = MAX_WORKERS):
+        # BaseService interval is the scheduler tick
         super().__init__(name, interval=1)
         self.client = MT5Client.get_instance()
         self.tasks: list[asyncio.Task] = []
         self.description = "Fetches market data periodically"
+        self.max_workers = max(1, max_workers)
+        self.executor: ThreadPoolExecutor = None
+        registry = registry or PIPELINE_REGISTRY
+        self._symbol_locks = {spec.symbol: threading.Lock() for spec in registry}
+        self.fetchers = [build_fetcher(spec) for spec in registry]
+        self.jobs = self._build_jobs(registry)
+
+    def _build_jobs(self, registry) -> list[PipelineJob]:
+        jobs = []
+        for spec, fetcher in zip(registry, self.fetchers):
+            jobs.append(PipelineJob(
+                spec.label, partial(self._sync_locked, fetcher), spec.poll_interval,
+                bar_seconds=TIMEFRAME_SECONDS[spec.timeframe], close_delay=spec.close_delay,
+            ))
+            if fetcher.aggregator is not None and spec.verify_interval > 0:
+                verify = partial(self._run_locked, spec.symbol, fetcher.aggregator.verify)
+                jobs.append(PipelineJob(f"{spec.symbol} derived TF check", verify, spec.verify_interval))
+        return jobs
 
     async def start(self):
         if self.running:
             logger.warning("⚠️ DataPipelineService already running.")
             return
 
-        logger.info("🚀 Starting Data Pipeline Service...")
+        logger.info(f"🚀 Starting Data Pipeline Service ({len(self.jobs)} jobs, {self.max_workers} workers)...")
         self.running = True
-
-        # Launch concurrent pipelines
-        self.tasks = [
-            asyncio.create_task(self.run_data_pipeline("M15", data_fetcher_xauusdc_m15.update_to_latest, 60 * 3)),  # every 3 minutes
-            asyncio.create_task(self.run_data_pipeline("M30", data_fetcher_xauusdc_m30.update_to_latest, 60 * 3)),  # every 3 minutes
-            
-            asyncio.create_task(self.run_data_pipeline("H1", data_fetcher_xauusdc_h1.update_to_latest, 60 * 10)),   # every 10 minutes
-            asyncio.create_task(self.run_data_pipeline("H4", data_fetcher_xauusdc_h4.update_to_latest, 60 * 10)),   # every 10 minutes
-            
-            asyncio.create_task(self.run_data_pipeline("D1", data_fetcher_xauusdc_d1.update_to_latest, 60 * 60)),  # every hour
-
-        ]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="data-pipeline")
+        self.tasks = [asyncio.create_task(self._schedule())]
 
     async def stop(self):
         if not self.running:
@@ -58,38 +108,82 @@ class DataPipelineService(BaseService):
             task.cancel()
         await asyncio.gather(*self.tasks, return_exceptions=True)
         self.tasks.clear()
+        if self.executor:
+            # Running syncs finish their transaction; queued ones are dropped
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
 
     async def run_once(self):
-        """If scheduler triggers manual single run."""
-        await self.run_data_pipeline("M15", data_fetcher_xauusdc_m15.update_to_latest, 0)
+        """If scheduler triggers manual single run: every fetcher once."""
+        loop = asyncio.get_event_loop()
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, self._sync_locked, f) for f in self.fetchers))
+        finally:
+            if executor is not self.executor:
+                executor.shutdown(wait=False)
 
     def check_mt5_connection(self) -> bool:
         return self.client.ensure_connected()
 
-    async def run_data_pipeline(self, label: str, fetcher_func, sleep_time: int):
-        """Generic data fetcher loop for one timeframe."""
-        while self.running:
-            try:
+    @staticmethod
+    def sync_and_publish(fetcher: MT5DataFetcher):
+        """Run one sync (worker thread) and announce every newly closed bar."""
+        closed = fetcher.update_to_latest() or {}
+        bus = CandleEventBus.get_instance()
+        for timeframe, bar_time in closed.items():
+            bus.publish(CandleClosed(fetcher.symbol, timeframe, int(bar_time)))
+        return closed
+
+    def _sync_locked(self, fetcher: MT5DataFetcher):
+        return self._run_locked(fetcher.symbol, partial(self.sync_and_publish, fetcher))
+
+    def _run_locked(self, symbol: str, func: Callable):
+        """Run func (worker thread) while holding the symbol's lock."""
+        with self._symbol_locks[symbol]:
+            return func()
+
+    # ===================================================
+    # Scheduling
+    # ===================================================
+    async def _schedule(self):
+        """Single loop: dispatch every due, idle job to the worker pool."""
+        in_flight: set[asyncio.Task] = set()
+        try:
+            while self.running:
                 if not self.check_mt5_connection():
-                    logger.error(f"❌ MT5 connection failed for {label}. Retrying in 30s...")
+                    logger.error("❌ MT5 connection failed. Retrying in 30s...")
                     await asyncio.sleep(30)
                     continue
 
-                start = time.monotonic()
-                logger.info(f"📊 {label} update started at {datetime.now().strftime('%H:%M:%S')}")
-
-                # Run the fetcher synchronously in executor (to avoid blocking the event loop)
-                await asyncio.get_event_loop().run_in_executor(None, fetcher_func)
-
-                elapsed = time.monotonic() - start
-                logger.info(f"✅ {label} update completed in {elapsed:.2f}s")
-
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-
-            except asyncio.CancelledError:
-                logger.info(f"⏹️ {label} loop cancelled.")
-                break
-            except Exception as e:
-                logger.error(f"🔥 {label} update error: {e}")
-                await asyncio.sleep(60)
+                now = time.monotonic()
+                for job in self.jobs:
+                    if job.busy or now < job.next_run:
+                        continue
+                    job.busy = True
+                    task = asyncio.create_task(self._run_job(job, self.executor))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            logger.info("⏹️ Data pipeline scheduler cancelled.")
+            for task in in_flight:
+                task.cancel()
+
+    async def _run_job(self, job: PipelineJob, executor):
+        start = time.monotonic()
+        job.busy = True
+        try:
+            logger.info(f"📊 {job.label} update started at {datetime.now().strftime('%H:%M:%S')}")
+            # Run the job synchronously in the shared pool (to avoid blocking the event loop)
+            await asyncio.get_event_loop().run_in_executor(executor, job.func)
+            logger.info(f"✅ {job.label} update completed in {time.monotonic() - start:.2f}s")
+            job.schedule_after(start)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"🔥 {job.label} update error: {e}")
+            job.next_run = time.monotonic() + 60
+        finally:
+            job.busy = False
@@ -0,0 +1,111 @@
+"""
+Benchmark: fib setup backtest (no DB).
+
+Compares the old per-setup simulation (filter the candle frame, then iterrows
+until entry / SL / TP) with fib_backtest_kernel on synthetic bars and setups,
+and checks both give the same entry, exit and reason for every setup.
+The old loop is only timed on the first LEGACY_CAP setups and extrapolated.
+
+Usage: python test/bench_fib_backtest.py [setups] [bars]   (default: 2000 200000)
+"""
+import sys, os, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pandas as pd
+from src.core.strategies.swing_point_fib import fib_backtest_kernel as kernel
+
+LEGACY_CAP = 200
+MAX_WAIT_MIN = 1800
+
+
+def make_data(n_setups, n_bars):
+    rng = np.random.default_rng(7)
+    close = 1800 + (rng.standard_normal(n_bars) * 2).cumsum()
+    times = 1_700_000_000 + np.arange(n_bars, dtype=np.int64) * 900
+    highs = close + np.abs(rng.standard_normal(n_bars)) * 2
+    lows = close - np.abs(rng.standard_normal(n_bars)) * 2
+
+    at = rng.integers(0, n_bars, n_setups)
+    bullish = rng.random(n_setups) < 0.5
+    entries = np.round(close[at], 2)
+    risk = np.abs(rng.standard_normal(n_setups)) * 5 + 1
+    sls = np.where(bullish, entries - risk, entries + risk)
+    tps = np.where(bullish, entries + 7, entries - 7)
+    discovered = times[np.maximum(0, at - rng.integers(0, 60, n_setups))]
+    return times, highs, lows, discovered, entries, sls, tps, bullish
+
+
+def legacy_one(df, entry, sl, tp, bullish):
+    entered = False
+    entry_time = None
+    expire_after = df["timestamp"].iloc[0] + pd.Timedelta(minutes=MAX_WAIT_MIN)
+    for _, row in df.iterrows():
+        high, low, ts = row["high"], row["low"], row["timestamp"]
+        if not entered and ts > expire_after:
+            return None, None, "expired"
+        if not entered:
+            if low <= entry <= high:
+                entered = True
+                entry_time = ts
+            else:
+                continue
+        if bullish:
+            if low <= sl:
+                return entry_time, ts, "sl"
+            if high >= tp:
+                return entry_time, ts, "tp"
+        else:
+            if low <= tp:
+                return entry_time, ts, "tp"
+            if high >= sl:
+                return entry_time, ts, "sl"
+    return (None, None, "expired") if not entered else (entry_time, None, "timeout")
+
+
+def legacy(times, highs, lows, discovered, entries, sls, tps, bullish):
+    df = pd.DataFrame({"timestamp": pd.to_datetime(times, unit="s"), "high": highs, "low": lows})
+    results = []
+    for i in range(len(entries)):
+        sub = df[df["timestamp"] >= pd.Timestamp(int(discovered[i]), unit="s")].reset_index(drop=True)
+        results.append(legacy_one(sub, entries[i], sls[i], tps[i], bullish[i]))
+    return results
+
+
+def to_results(times, entry_idx, exit_idx, exit_code):
+    results = []
+    for e, x, code in zip(entry_idx, exit_idx, exit_code):
+        if e < 0:
+            results.append((None, None, "expired"))
+            continue
+        exit_time = pd.Timestamp(int(times[x]), unit="s") if x >= 0 else None
+        results.append((pd.Timestamp(int(times[e]), unit="s"), exit_time, kernel.EXIT_REASONS[int(code)]))
+    return results
+
+
+def run(n_setups, n_bars):
+    times, highs, lows, discovered, entries, sls, tps, bullish = make_data(n_setups, n_bars)
+    cap = min(n_setups, LEGACY_CAP)
+
+    start = time.perf_counter()
+    old = legacy(times, highs, lows, discovered[:cap], entries[:cap], sls[:cap], tps[:cap], bullish[:cap])
+    old_time = (time.perf_counter() - start) * n_setups / cap
+
+    start = time.perf_counter()
+    entry_idx, exit_idx, exit_code = kernel.simulate(
+        times, highs, lows, discovered, entries, sls, tps, bullish, MAX_WAIT_MIN * 60
+    )
+    new_time = time.perf_counter() - start
+
+    assert old == to_results(times, entry_idx[:cap], exit_idx[:cap], exit_code[:cap]), "kernel differs from legacy loop"
+
+    note = " (est.)" if n_setups > LEGACY_CAP else ""
+    print(
+        f"{n_setups:>7,} setups on {n_bars:>9,} bars   legacy: {old_time:>9.2f}s{note:<7} "
+        f"kernel: {new_time:>7.3f}s   speedup: {old_time / new_time:>8,.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    n_setups = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    run(n_setups, n_bars)
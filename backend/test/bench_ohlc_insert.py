@@ -0,0 +1,99 @@
+"""
+Benchmark: OHLC write paths (rows/sec).
+
+Compares the old REPLACE + executemany path (500-row slices, commit per slice)
+with the multi-row INSERT ... ON DUPLICATE KEY UPDATE path and, when
+DB_ALLOW_LOCAL_INFILE=True, LOAD DATA LOCAL INFILE.
+
+Each path writes N fresh rows, then re-syncs a 10% overlap, into a scratch
+copy of ohlc_xauusdc_m15_data that is dropped afterwards.
+
+Usage: python test/bench_ohlc_insert.py [rows]
+"""
+import sys, os, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pandas as pd
+from src.core.db.connection import get_connection, DB_CONFIG
+from src.core.mt5.data_fetcher import MT5DataFetcher
+
+SOURCE_TABLE = "ohlc_xauusdc_m15_data"
+BENCH_TABLE = "ohlc_bench_insert_tmp"
+
+
+def make_rows(n, start=1_300_000_000):
+    rng = np.random.default_rng(42)
+    close = 1800 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        "symbol": "XAUUSDc",
+        "time": start + np.arange(n, dtype=np.int64) * 900,
+        "open": close + rng.standard_normal(n) * 0.1,
+        "high": close + 1.0,
+        "low": close - 1.0,
+        "close": close,
+        "tick_volume": rng.integers(100, 5000, n),
+        "spread": 16,
+        "real_volume": 0,
+    })
+
+
+def legacy_replace(conn, table, data):
+    """The pre-bulk path: REPLACE INTO via executemany, commit per 500 rows."""
+    query = f"""
+        REPLACE INTO {table}
+        (symbol, time, open, high, low, close, tick_volume, spread, real_volume)
+        VALUES (%(symbol)s, %(time)s, %(open)s, %(high)s, %(low)s, %(close)s, %(tick_volume)s, %(spread)s, %(real_volume)s)
+    """
+    cursor = conn.cursor()
+    for i in range(0, len(data), 500):
+        cursor.executemany(query, data.iloc[i:i + 500].to_dict("records"))
+        conn.commit()
+    cursor.close()
+
+
+def bulk_upsert(conn, table, data):
+    MT5DataFetcher("XAUUSDc", table, 0, 900).batch_insert(conn, data)
+    conn.commit()
+
+
+def load_data(conn, table, data):
+    MT5DataFetcher("XAUUSDc", table, 0, 900).load_data_insert(conn, data)
+    conn.commit()
+
+
+def run(label, writer, rows):
+    overlap = rows.tail(len(rows) // 10)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE {SOURCE_TABLE}")
+        conn.commit()
+
+        start = time.perf_counter()
+        writer(conn, BENCH_TABLE, rows)
+        fresh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        writer(conn, BENCH_TABLE, overlap)
+        resync = time.perf_counter() - start
+
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        conn.commit()
+        cursor.close()
+
+    print(
+        f"{label:<22} fresh: {len(rows) / fresh:>10,.0f} rows/s   "
+        f"re-sync overlap: {len(overlap) / resync:>10,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rows = make_rows(n)
+    print(f"Writing {n} rows into {BENCH_TABLE} (copy of {SOURCE_TABLE})")
+    run("REPLACE executemany", legacy_replace, rows)
+    run("multi-row upsert", bulk_upsert, rows)
+    if DB_CONFIG.get("allow_local_infile"):
+        run("LOAD DATA LOCAL", load_data, rows)
+    else:
+        print("LOAD DATA LOCAL        skipped (set DB_ALLOW_LOCAL_INFILE=True)")
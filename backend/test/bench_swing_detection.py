@@ -0,0 +1,97 @@
+"""
+Benchmark: strict swing detection + power scores (no DB).
+
+Compares the old per-candle loop (window max/min per candle, full rolling
+mean per swing → O(n²)) with the vectorized swing_engine on synthetic bars,
+and checks both produce the same swings and scores.
+The old loop is only timed on the first LEGACY_CAP candles of large inputs
+and extrapolated linearly (a lower bound, since its cost grows with n²).
+
+Usage: python test/bench_swing_detection.py [bars ...]   (default: 5000 500000)
+"""
+import sys, os, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pandas as pd
+from src.core.strategies.swing_point_fib.swing_engine import detect_strict_swings, PowerScorer
+
+LEGACY_CAP = 5000
+WINDOW = 3
+
+
+def make_candles(n):
+    rng = np.random.default_rng(7)
+    close = 1800 + rng.standard_normal(n).cumsum()
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.standard_normal(n)) + 0.2
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+    })
+
+
+def legacy_power(df, idx, swing_type, lookback=10):
+    try:
+        avg_range = df["high"].sub(df["low"]).rolling(lookback).mean().iloc[idx]
+        curr_range = df["high"].iloc[idx] - df["low"].iloc[idx]
+        momentum = abs(df["close"].iloc[idx] - df["close"].iloc[max(0, idx - 3)]) / avg_range
+        if swing_type == "high":
+            prev_extreme = df["high"].iloc[max(0, idx - lookback):idx].max()
+            extremity = (df["high"].iloc[idx] - prev_extreme) / avg_range
+        else:
+            prev_extreme = df["low"].iloc[max(0, idx - lookback):idx].min()
+            extremity = (prev_extreme - df["low"].iloc[idx]) / avg_range
+        power = 0.5 + (curr_range / avg_range) * 0.3 + momentum * 0.3 + extremity * 0.4
+        return round(max(0.5, min(power, 5.0)), 2)
+    except Exception:
+        return 1.0
+
+
+def legacy(df):
+    highs, lows = df["high"].values, df["low"].values
+    swings = []
+    for i in range(WINDOW, len(df) - WINDOW):
+        if highs[i] == max(highs[i - WINDOW:i + WINDOW + 1]):
+            swings.append((i, "high", legacy_power(df, i, "high")))
+        if lows[i] == min(lows[i - WINDOW:i + WINDOW + 1]):
+            swings.append((i, "low", legacy_power(df, i, "low")))
+    return swings
+
+
+def vectorized(df):
+    high_idx, low_idx = detect_strict_swings(df["high"].values, df["low"].values, WINDOW)
+    scorer = PowerScorer(df)
+    swings = list(zip(high_idx.tolist(), ["high"] * len(high_idx), scorer.scores(high_idx, "high")))
+    swings += zip(low_idx.tolist(), ["low"] * len(low_idx), scorer.scores(low_idx, "low"))
+    return sorted(swings, key=lambda s: (s[0], s[1] != "high"))
+
+
+def run(n):
+    df = make_candles(n)
+    legacy_df = df.iloc[:min(n, LEGACY_CAP)].reset_index(drop=True)
+
+    start = time.perf_counter()
+    old = legacy(legacy_df)
+    old_time = (time.perf_counter() - start) * n / len(legacy_df)
+
+    start = time.perf_counter()
+    new = vectorized(df)
+    new_time = time.perf_counter() - start
+
+    # Same swings and scores on the overlapping part (the last WINDOW candles differ only by truncation)
+    limit = len(legacy_df) - WINDOW
+    assert old == [s for s in vectorized(legacy_df) if s[0] < limit], "vectorized result differs from legacy loop"
+
+    note = " (est.)" if n > LEGACY_CAP else ""
+    print(
+        f"{n:>9,} bars  {len(new):>7,} swings   legacy: {old_time:>9.2f}s{note:<7} "
+        f"vectorized: {new_time:>7.3f}s   speedup: {old_time / new_time:>8,.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [5000, 500_000]
+    for n in sizes:
+        run(n)
@@ -2,5 +2,7 @@ import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.core.strategies.swing_point_fib.fib_backtest_service import FibBacktestService
 
-FibBacktestService().run_all()
-print("Done")
\ No newline at end of file
+if __name__ == "__main__":
+    # Guard required: with BACKTEST_WORKERS > 1, spawned workers re-import this script
+    FibBacktestService().run_all()
+    print("Done")
\ No newline at end of file